@@ -61,7 +61,7 @@ echo "Target : ${OUT}"
 # Main compiler invokation:
 #
 cc -I${NUMPY} -I${PY} ${LIB} -O3 -ffast-math -DNPY_NO_DEPRECATED_API \
-   -fPIC -std=c++0x ${SHARED} -o ${OUT} \
+   -fPIC -std=c++0x -pthread ${SHARED} -o ${OUT} \
    src/lib/xgates.cc || exit 1
 
 echo "Made   :"
@@ -70,7 +70,7 @@ def run_experiment(nbits_phase: int,
   psi = ops.PhaseEstimation(grover, psi, nbits_phase, nbits_phase)
 
   # Reverse QFT gives us the phase as a fraction of 2*pi.
-  psi = ops.Qft(nbits_phase).adjoint()(psi)
+  psi = ops.apply_qft(psi, 0, nbits_phase, inverse=True)
 
   # Get the state with highest probability and estimate a phase.
   maxbits, _ = psi.maxprob()
@@ -1,14 +1,12 @@
 # python3
 """Example: CHSH implementation and measurement."""
 
-import random
+import itertools
 
 from absl import app
 import numpy as np
 from src.lib import bell
-from src.lib import helper
-from src.lib import ops
-from src.lib import state
+from src.lib import circuit
 
 
 # The CHSH game, named after Clauser, Horne, Shimony, and Holt,
@@ -60,43 +58,30 @@ from src.lib import state
 # random measurements in the various bases.
 
 
-def measure(psi: state.State):
-  """Simulated, probabilistic measurement."""
-
-  # We assume that random numbers are evenly distributed,
-  # which will ensure that states are selected weighted
-  # by their probabilities.
-  #
-  r = random.random() - 1e-6
-  total = 0
-  for idx, val in enumerate(psi):
-    total += val * val.conj()
-    if r < total:
-      bits = helper.val2bits(idx, 2)
-      return bits[0], bits[1]
-
-
 def run_experiments(experiments: int, alpha: float) -> float:
   """Run CHSH experiments for a given angle."""
 
+  # The referee's bits x and y are random, each of the four cases
+  # is equally likely. For each case, we prepare the rotated Bell
+  # state once and draw all of its measurements (a, b) at once.
   wins = 0
-  for _ in range(experiments):
-    x = random.randint(0, 1)
-    y = random.randint(0, 1)
-    psi = bell.bell_state(0, 0)
+  cases = np.random.multinomial(experiments, [0.25] * 4)
+  for (x, y), shots in zip(itertools.product([0, 1], repeat=2), cases):
+    qc = circuit.qc('chsh')
+    qc.state(bell.bell_state(0, 0))
 
     if x == 0:
       pass
     if x == 1:
-      psi = ops.RotationY(2.0 * alpha)(psi, 0)
+      qc.ry(0, 2.0 * alpha)
     if y == 0:
-      psi = ops.RotationY(alpha)(psi, 1)
+      qc.ry(1, alpha)
     if y == 1:
-      psi = ops.RotationY(-alpha)(psi, 1)
+      qc.ry(1, -alpha)
 
-    a, b = measure(psi)
-    if x * y == (a + b) % 2:
-      wins += 1
+    outcomes = qc.sample(shots)
+    a, b = outcomes >> 1, outcomes & 1
+    wins += np.count_nonzero(x * y == (a + b) % 2)
 
   return wins / experiments * 100.0
 
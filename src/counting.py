@@ -68,22 +68,20 @@ def run_experiment(nbits_phase: int, nbits_grover: int, solutions: int) -> None:
   grover = inversion(u)
 
   # Now that we have the Grover operator, we have to perform
-  # phase estimation. This loop is a copy from phase_estimation.py
-  # with more comments there.
-  cu = grover
-  for inv in reversed(range(nbits_phase)):
-    psi = ops.ControlledU(inv, nbits_phase, cu)(psi, inv)
-    cu = cu(cu)
+  # phase estimation. See phase_estimation.py for more comments.
+  psi = ops.PhaseEstimation(grover, psi, nbits_phase, nbits_phase)
 
   # Reverse QFT gives us the phase as a fraction of 2*pi.
-  psi = ops.Qft(nbits_phase).adjoint()(psi)
+  psi = ops.apply_qft(psi, 0, nbits_phase, inverse=True)
 
-  # Get the state with highest probability and compute the phase
-  # as a binary fraction. Note that the probability decreases
+  # Get the most likely value of the phase register and compute the
+  # phase as a binary fraction. Note that the probability decreases
   # as M, the number of solutions, gets closer and closer to N,
   # the total mnumber of states.
-  maxbits, maxprob = psi.maxprob()
-  phi_estimate = helper.bits2frac(maxbits)
+  probs = psi.probabilities(range(nbits_phase))
+  maxval = probs.argmax()
+  maxprob = probs[maxval]
+  phi_estimate = maxval / 2**nbits_phase
 
   # We know that after phase estimation, this holds:
   #    sin(phi/2) = sqrt(M/N)
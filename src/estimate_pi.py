@@ -18,7 +18,6 @@
 from absl import app
 import numpy as np
 from src.lib import circuit
-from src.lib import helper
 
 
 def run_experiment(nbits_phase):
@@ -49,8 +48,9 @@ def run_experiment(nbits_phase):
     qc.cu1(qclock[inv], qbit[0], 2 ** (nbits_phase - inv - 1))
   qc.inverse_qft(qclock)
 
-  bits, _ = qc.psi.maxprob()
-  theta = helper.bits2frac(bits[:nbits_phase][::-1])
+  # The clock register holds the phase in reversed bit order.
+  probs = qc.reg_probabilities(qclock[::-1])
+  theta = probs.argmax() / 2**nbits_phase
   pi = 1 / (2 * theta)
   delta = np.abs(pi - np.pi)
 
@@ -6,6 +6,7 @@ import random
 from absl import app
 import numpy as np
 
+from src.lib import circuit
 from src.lib import ops
 from src.lib import state
 
@@ -35,16 +36,17 @@ def run_experiment(a, b):
 
   # Make a combined state with an ancilla (|0>), phi, and psi:
   #
-  combo = state.bitstring(0) * phi * psi
+  qc = circuit.qc('euclidean distance')
+  qc.state(state.bitstring(0) * phi * psi)
 
   # Construct a swap test and find the measurement probability
   # of the ancilla.
   #
-  combo = ops.Hadamard()(combo, 0)
-  combo = ops.ControlledU(0, 1, ops.Swap(1, 2))(combo)
-  combo = ops.Hadamard()(combo, 0)
+  qc.h(0)
+  qc.cunitary(0, [1, 2], ops.Swap(0, 1), 'swap')
+  qc.h(0)
 
-  p0, _ = ops.Measure(combo, 0)
+  p0, _ = qc.measure_bit(0, 0, collapse=False)
 
   # Now compute the euclidian norm from the probability.
   #
@@ -8,10 +8,11 @@ from typing import List
 from absl import app
 import numpy as np
 
+from src.lib import amplification
 from src.lib import circuit
 from src.lib import helper
 from src.lib import ops
-from src.lib import state
+from src.lib import runner
 
 
 # This function can be used if there is only 1 solution,
@@ -28,20 +29,22 @@ def make_f1(d: int = 3):
 
 
 def make_f(d: int = 3, nsolutions: int = 1):
-  """Construct function that will return 1 for 'solutions' bits."""
+  """Construct predicate that is True for 'solutions' state indices."""
 
+  # The predicate is vectorized, it accepts an int or an array of ints.
   answers = np.zeros(1 << d, dtype=np.int8)
   solutions = random.sample(range(1 << d), nsolutions)
   answers[solutions] = 1
-  return lambda bits: answers[helper.bits2val(bits)]
+  return lambda x: answers[x] == 1
 
 
 def run_experiment(nbits: int, solutions: int) -> None:
   """Run oracle-based experiment."""
 
-  # Note that op_zero multiplies the diagonal elements of the operator by -1,
-  # except for element [0][0]. This can be interpreted as "rotating around
-  # the |00..)>" state. More pragmatically, multiplying this op_zero with
+  # Note that the reflection 2|0><0| - I multiplies the diagonal elements
+  # of the operator by -1, except for element [0][0]. This can be
+  # interpreted as "rotating around the |00..)>" state. More
+  # pragmatically, multiplying this reflection with
   # a Hadamard from the left and right gives a matrix of this form:
   #
   # 2/N-1   2/N    2/N    ...   2/N
@@ -54,36 +57,32 @@ def run_experiment(nbits: int, solutions: int) -> None:
   # for every vector element c_x, with u being the mean over the
   # state vector. This is the defintion of inversion about the mean.
   #
-  op_zero = ops.ZeroProjector(nbits)
-  reflection = op_zero * 2.0 - ops.Identity(nbits)
+  # Building this matrix costs O(4^n) memory and time. Instead, we
+  # compute 2u - c_x directly, in O(2^n) (see amplification.py).
+  #
 
-  # Make f and Uf. Note:
-  # We reserve space for an ancilla 'y'. This allows reuse of
-  # the Deutsch Uf builder.
+  # Make f and the Oracle. Note:
+  # The Deutsch-style Uf builder (ops.OracleUf) needs an ancilla 'y'
+  # in state |->, which turns the xor into a phase of -1. Here, we
+  # use a phase Oracle instead, which flips the sign of the marked
+  # states directly, without ancilla. It evaluates f only once,
+  # over all state indices.
   #
-  # We use the Oracle construction for convenience. It is rather
-  # slow (full matrix) for larger qubit counts. Once can construct
-  # a 'regular' circuit for the grover search algorithms, but this
-  # circuit is different for each bitstring. Circuit versions are
+  # We use the Oracle construction for convenience. Once can
+  # construct a 'regular' circuit for the grover search algorithms, but
+  # this circuit is different for each bitstring. Circuit versions are
   # below.
   #
   f = make_f(nbits, solutions)
-  uf = ops.OracleUf(nbits + 1, f)
-
-  # Build state with 1 ancilla of |1>.
-  #
-  psi = state.zeros(nbits) * state.ones(1)
-  for i in range(nbits + 1):
-    psi.apply1(ops.Hadamard(), i)
+  oracle = ops.PhaseOracle(nbits, f)
 
-  # Build Grover operator, note Id() for the ancilla.
-  # The Grover operator is the combination of:
-  #    - phase inversion via the u unitary
+  # Build state in equal superposition and the Grover iteration.
+  # The Grover iteration is the combination of:
+  #    - phase inversion via the Oracle
   #    - inversion about the mean (see matrix above)
   #
-  hn = ops.Hadamard(nbits)
-  inversion = hn(reflection(hn)) * ops.Identity()
-  grover = inversion(uf)
+  grover = amplification.Amplifier(amplification.uniform(nbits), oracle)
+  psi = grover.prepared
 
   # Number of Grover iterations
   #
@@ -106,18 +105,14 @@ def run_experiment(nbits: int, solutions: int) -> None:
   #
   iterations = int(math.pi / 4 * math.sqrt(2**nbits / solutions))
   for _ in range(iterations):
-    psi = grover(psi)
+    psi = grover.step(psi)
 
   # Measurement - pick element with higher probability.
   #
-  # Note: We constructed the Oracle with n+1 qubits, to allow
-  # for the 'xor-ancillary'. To check the result, we need to
-  # ignore this ancilla.
-  #
   maxbits, maxprob = psi.maxprob()
-  result = f(maxbits[:-1])
+  result = int(f(helper.bits2val(maxbits)))
   print('Matrix : Got f({}) = {}, want: 1, #: {:2d}, p: {:6.4f}'
-        .format(maxbits[:-1], result, solutions, maxprob))
+        .format(maxbits, result, solutions, maxprob))
   assert result == 1, 'Something went wrong, invalid state'
 
 
@@ -131,12 +126,10 @@ def run_experiment_circuit(nbits: int) -> None:
       if mask[i] == allow:
         qc.apply1(gate, i, gate.name)
 
-  # This implementation uses the 'trivial' multi-controlled gates,
-  # which introduce _a lot_ of ancilla gates. As a result, there
-  # are practically no benefits over the matrix-based implementation.
-  # Once an optimized multi-controlled implementation is available,
-  # then the circuit-based performance for many qubits will do
-  # much better!.
+  # The IR of this implementation uses the 'trivial' multi-controlled
+  # gates, which introduce _a lot_ of ancilla gates. In eager mode,
+  # however, the multi-controlled gates are simulated directly and
+  # the ancillae remain untouched.
   #
   qc = circuit.qc('Grover')
   reg = qc.reg(nbits, 0)
@@ -172,15 +165,14 @@ def main(argv):
   if len(argv) > 1:
     raise app.UsageError('Too many command-line arguments.')
 
+  # The experiments are independent of each other and run
+  # concurrently (see --experiment_threads). Output order may vary.
   print('Grover: Find single solution, increasing qubits.')
-  for nbits in range(3, 10):
-    run_experiment(nbits, 1)
+  runner.run_concurrent(run_experiment, range(3, 10), [1] * 7)
   print('Grover: Via circuit.')
-  for nbits in range(6, 10):
-    run_experiment_circuit(nbits)
+  runner.run_concurrent(run_experiment_circuit, range(6, 10))
   print('Amplitude Amplification: Find increasing solutions, stable qubits.')
-  for solutions in range(1, 9):
-    run_experiment(7, solutions)
+  runner.run_concurrent(run_experiment, [7] * 8, range(1, 9))
 
 
 if __name__ == '__main__':
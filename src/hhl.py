@@ -108,8 +108,7 @@ def construct_circuit(b, w, u, c, clock_bits):
   # Phase estimation to bring the eigenvalues into the clock register.
   u_inv_gates = []
   for idx in range(clock_bits):
-    op = ops.ControlledU(clock[idx], breg[0], u)
-    qc.unitary(op, clock[idx])
+    qc.cunitary(clock[idx], breg, u)
     u_inv_gates.append(np.linalg.inv(u))
     u = u @ u
 
@@ -124,9 +123,7 @@ def construct_circuit(b, w, u, c, clock_bits):
   # Uncompute.
   qc.qft(clock, True)
   for idx in reversed(range(clock_bits)):
-    op = ops.ControlledU(clock[idx], breg[0],
-                         u_inv_gates[idx])
-    qc.unitary(op, clock[idx])
+    qc.cunitary(clock[idx], breg, u_inv_gates[idx])
 
   # Move clock bits out of Hadamard basis.
   qc.h(clock)
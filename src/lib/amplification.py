@@ -0,0 +1,124 @@
+# python3
+"""Matrix-free amplitude amplification."""
+
+# The Grover operator is the product of two reflections. The Oracle
+# flips the sign of the 'good' states. The inversion about the mean,
+# more generally, the reflection about the prepared state |a> = A|0>,
+# is:
+#
+#     A (2|0><0| - I) A^dagger = 2|a><a| - I
+#
+# Building both as dense operators costs O(4^n) in memory and time,
+# per iteration. Yet, neither needs a matrix. The reflection about
+# |a> is a single inner product and an axpy:
+#
+#     psi -> 2 <a|psi> a - psi
+#
+# which, for the equal superposition, is the familiar 2 * mean - psi.
+# An Oracle given as a boolean mask over the state indices is just a
+# sign flip, and a PermutationOperator (e.g., ops.OracleUf with its
+# ancilla in |->) or DiagonalOperator (ops.PhaseOracle) is applied in
+# O(2^n) as well.
+#
+# The probability a of measuring a good state in |a> is all that is
+# needed to predict how amplification proceeds. With sin^2(theta) = a,
+# k iterations give a success probability of:
+#
+#     sin^2((2k + 1) theta)
+#
+# For an Oracle O = I - 2 P_good, a = (1 - <a|O|a>) / 2. This only
+# takes one Oracle application, independent of the Oracle's type.
+#
+# Note that the optimal number of iterations grows with sqrt(2^n),
+# and the error of each inner product accumulates over all of them.
+# A BLAS vdot sums up all 2^n terms sequentially, in single precision
+# with the default --tensor_width. We only use it on blocks of the
+# state, and sum up the partial results in double precision.
+
+import math
+from typing import Union
+
+import numpy as np
+
+from src.lib import ops
+from src.lib import state
+
+
+# Number of amplitudes per partial inner product.
+_BLOCK = 1 << 12
+
+
+class Amplifier:
+  """Amplitude amplification of the good states of a prepared state."""
+
+  def __init__(self, prepared: state.State,
+               oracle: Union[np.ndarray, ops.Operator,
+                             ops.PermutationOperator, ops.DiagonalOperator]):
+    self.prepared = state.State(prepared)
+    if isinstance(oracle, np.ndarray) and oracle.dtype == bool:
+      if oracle.shape != self.prepared.shape:
+        raise ValueError('Oracle mask must match the prepared state.')
+      oracle = ops.DiagonalOperator(np.where(oracle, -1.0, 1.0))
+    elif oracle.nbits != self.prepared.nbits:
+      raise ValueError('Oracle and prepared state have different sizes.')
+    self.oracle = oracle
+
+    good = self.overlap(self.prepared, self.flip(self.prepared)).real
+    self.probability = min(max((1.0 - good) / 2, 0.0), 1.0)
+    self.theta = math.asin(math.sqrt(self.probability))
+
+  @staticmethod
+  def overlap(a: state.State, b: state.State) -> complex:
+    """Return the inner product <a|b>, accurately."""
+
+    a, b = np.asarray(a), np.asarray(b)
+    total = 0j
+    for start in range(0, a.size, _BLOCK):
+      total += complex(np.vdot(a[start:start + _BLOCK],
+                               b[start:start + _BLOCK]))
+    return total
+
+  def flip(self, psi: state.State) -> state.State:
+    """Apply the Oracle, flipping the sign of the good states."""
+
+    return self.oracle(psi)
+
+  def reflect(self, psi: state.State) -> state.State:
+    """Reflect psi about the prepared state."""
+
+    res = np.multiply(self.prepared, 2 * self.overlap(self.prepared, psi))
+    res -= psi
+    return res
+
+  def step(self, psi: state.State) -> state.State:
+    """Apply a single Grover iteration."""
+
+    return self.reflect(self.flip(psi))
+
+  def iterations(self) -> int:
+    """Return the iteration count that maximizes the success probability."""
+
+    if self.theta == 0.0:
+      return 0
+    return max(int(round(math.pi / (4 * self.theta) - 0.5)), 0)
+
+  def success_probability(self, iterations) -> np.ndarray:
+    """Return the success probability after (an array of) iterations."""
+
+    return np.sin((2 * np.asarray(iterations) + 1) * self.theta) ** 2
+
+  def run(self, iterations: int = None) -> state.State:
+    """Amplify, by default with the optimal number of iterations."""
+
+    if iterations is None:
+      iterations = self.iterations()
+    psi = self.prepared.copy()
+    for _ in range(iterations):
+      psi = self.step(psi)
+    return psi
+
+
+def uniform(nbits: int) -> state.State:
+  """Return the equal superposition H^n|0> over nbits qubits."""
+
+  return state.State(np.full(1 << nbits, 1.0 / math.sqrt(1 << nbits)))
@@ -0,0 +1,81 @@
+# python3
+import math
+import random
+
+from absl.testing import absltest
+import numpy as np
+
+from src.lib import amplification
+from src.lib import helper
+from src.lib import ops
+from src.lib import state
+
+
+class AmplificationTest(absltest.TestCase):
+
+  def dense_grover(self, nbits: int, answers) -> ops.Operator:
+    reflection = ops.ZeroProjector(nbits) * 2.0 - ops.Identity(nbits)
+    hn = ops.Hadamard(nbits)
+    oracle = ops.Operator(np.diag(1.0 - 2.0 * answers))
+    return oracle(hn(reflection(hn)))
+
+  def test_step(self):
+    nbits = 6
+    answers = np.zeros(1 << nbits)
+    answers[random.sample(range(1 << nbits), 3)] = 1
+    grover = self.dense_grover(nbits, answers)
+    prepared = amplification.uniform(nbits)
+    psi = state.rand_state(nbits)
+
+    for oracle in [answers == 1,
+                   ops.PhaseOracle(nbits, lambda x: answers[x] == 1)]:
+      amp = amplification.Amplifier(prepared, oracle)
+      self.assertTrue(amp.step(psi).is_close(grover(psi)))
+
+    # Oracle with an ancilla in |->.
+    uf = ops.OracleUf(nbits + 1, lambda bits: answers[helper.bits2val(bits)])
+    minus = state.minus()
+    amp = amplification.Amplifier(prepared * minus, uf)
+    self.assertTrue(amp.step(psi * minus).is_close(grover(psi) * minus))
+
+  def test_prepared(self):
+    nbits = 5
+    algo = ops.Hadamard(nbits)(ops.RotationY(0.7) * ops.Identity(nbits - 1))
+    prepared = algo(state.zeros(nbits))
+    mask = np.zeros(1 << nbits, dtype=bool)
+    mask[[3, 17]] = True
+
+    reflection = ops.ZeroProjector(nbits) * 2.0 - ops.Identity(nbits)
+    dense = algo.adjoint()(reflection(algo))
+    amp = amplification.Amplifier(prepared, mask)
+    psi = state.State(np.random.randn(1 << nbits) + 0j).normalize()
+    self.assertTrue(amp.reflect(psi).is_close(dense(psi)))
+
+  def test_success_probability(self):
+    nbits = 8
+    for nsolutions in [1, 3, 10]:
+      mask = np.zeros(1 << nbits, dtype=bool)
+      mask[random.sample(range(1 << nbits), nsolutions)] = True
+      amp = amplification.Amplifier(amplification.uniform(nbits), mask)
+      self.assertAlmostEqual(amp.probability, nsolutions / (1 << nbits))
+
+      curve = amp.success_probability(np.arange(20))
+      psi = amp.prepared
+      for k in range(20):
+        self.assertAlmostEqual(np.linalg.norm(psi[mask])**2, curve[k],
+                               places=4)
+        psi = amp.step(psi)
+
+      iterations = amp.iterations()
+      # The curve is periodic, the optimum is its first maximum.
+      self.assertGreaterEqual(curve[iterations], curve[iterations + 1])
+      self.assertGreaterEqual(curve[iterations], curve[iterations - 1])
+      self.assertLessEqual(
+          iterations, math.pi / 4 * math.sqrt((1 << nbits) / nsolutions))
+      psi = amp.run()
+      self.assertAlmostEqual(np.linalg.norm(psi[mask])**2, curve[iterations],
+                             places=4)
+
+
+if __name__ == '__main__':
+  absltest.main()
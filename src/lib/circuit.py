@@ -13,8 +13,11 @@ import numpy as np
 from scipy.linalg import sqrtm
 from scipy.stats import unitary_group
 from src.lib import dumpers
+from src.lib import helper
 from src.lib import ir
 from src.lib import ops
+from src.lib import permutation_layer
+from src.lib import phase_layer
 from src.lib import state
 from src.lib import tensor
 
@@ -22,7 +25,8 @@ from src.lib import tensor
 # Many of the algorithm implementation rely on the fast performance
 # provided by libxgates. However, it can be difficult to build,
 # depending on your environment. To enable a quick start on this codebase
-# we provide Python fallback functions. They work, but are slow.
+# we provide a vectorized NumPy fallback in npgates.py, which offers
+# the same functions. It is slower than libxgates, but usable.
 #
 # Configure: The following line might have to change, depending on
 #            the current build environment.
@@ -36,26 +40,26 @@ from src.lib import tensor
 try:
   # pylint: disable=g-import-not-at-top
   import libxgates as xgates
-
-  apply1 = xgates.apply1
-  applyc = xgates.applyc
 except Exception:  # pylint: disable=broad-except
   print("""
   **************************************************************
   WARNING: Could not find 'libxgates.so'.
   Please build it and point PYTHONPATH to it.
-  Execution is being re-directed to a Python implementation,
-  performance may suffer greatly.
+  Execution is being re-directed to a NumPy implementation,
+  performance may suffer.
   **************************************************************
   """)
 
-  # pylint: disable=unused-argument
-  def apply1(psi, gate: np.ndarray, nbits: int, qubit: int, bitwidth: int = 0):
-    return psi.apply1(gate.reshape((2, 2)), qubit)
+  # pylint: disable=g-import-not-at-top
+  from src.lib import npgates as xgates
 
-  # pylint: disable=unused-argument
-  def applyc(psi, gate, nbits, control, target, bitwidth=0):
-    return psi.applyc(gate.reshape((2, 2)), control, target)
+apply1 = xgates.apply1
+applyc = xgates.applyc
+apply2 = xgates.apply2
+applymc = xgates.applymc
+applyd = xgates.applyd
+applymcd = xgates.applymcd
+applyh = xgates.applyh
 
 
 flags.DEFINE_string('libq', '', 'Generate libq output file, or empty')
@@ -65,11 +69,77 @@ flags.DEFINE_string('text', '', 'Generate text output file, or empty')
 flags.DEFINE_string('latex', '', 'Generate Latex output file, or empty')
 
 
+# Materializing a phase layer (see apply_layer) costs about as much
+# as 16 diagonal kernel calls, a permutation layer (one gather) about
+# as much as 4 kernel calls. Shorter layers are applied gate by gate.
+# For small states, the passes over the state are cheaper than the
+# bookkeeping for the layers.
+_MIN_PHASE_LAYER = 16
+_MIN_PERMUTATION_LAYER = 4
+_MIN_LAYER_BITS = 12
+
+
+# Helpers for the gate fusion in eager mode (see qc.psi below). Fused
+# gates act on one or two qubits. Two-qubit gates are 4x4 matrices on
+# the basis |q0 q1>, with q0 being the higher-order bit.
+def _controlled(gate: np.ndarray) -> np.ndarray:
+  """Make 4x4 matrix for gate, controlled by the first qubit."""
+
+  op = np.identity(4, dtype=np.complex128)
+  op[2:, 2:] = gate
+  return op
+
+
+# Macros in the IR are named after the qc method that adds them,
+# these are their inverses (see qc.inverse).
+_INVERSE_MACRO = {'qft': 'inverse_qft', 'inverse_qft': 'qft'}
+
+
+def _offset(ctl, offset: int):
+  """Offset a controller, which may be a control-by-0 [qubit]."""
+
+  if isinstance(ctl, int):
+    return ctl + offset
+  return [ctl[0] + offset]
+
+
+def _close(a: np.ndarray, b, atol: float = 1e-12) -> bool:
+  """Check whether a small gate (block) is elementwise close to b."""
+
+  # This runs for every flushed gate. For 2x2 and 4x4 matrices,
+  # np.allclose costs far more than applying the gate itself.
+  return float(np.max(np.abs(a - b))) <= atol
+
+
+def _diagonal(gate: np.ndarray) -> bool:
+  """Check whether a gate only changes phases."""
+
+  return _close(gate, np.diag(np.diagonal(gate)))
+
+
+def _expand(gate: np.ndarray, qubits, order) -> np.ndarray:
+  """Expand a gate on qubits to a gate on qubits in order."""
+
+  if tuple(qubits) == tuple(order):
+    return gate
+  eye = np.identity(2, dtype=np.complex128)
+  if len(qubits) == 1:
+    if qubits[0] == order[0]:
+      return np.kron(gate, eye)
+    return np.kron(eye, gate)
+  # Same two qubits, in reversed order.
+  perm = [0, 2, 1, 3]
+  return gate[np.ix_(perm, perm)]
+
+
 class qc:
   """Wrapper class to maintain state + operators."""
 
   def __init__(self, name=None, eager: bool = True):
     self.name = name
+    self.pending = {}
+    self.phases = phase_layer.PhaseLayer()
+    self.permutations = permutation_layer.PermutationLayer()
     self.psi = state.State(1.0)
     self.ir = ir.Ir()
     self.eager = eager
@@ -102,7 +172,196 @@ class qc:
 
   @property
   def nbits(self) -> int:
-    return self.psi.nbits
+    return self._psi.nbits
+
+  # In eager mode, gates are not applied right away. Consecutive gates
+  # on the same one or two qubits are multiplied into a single 2x2 or
+  # 4x4 matrix. These fused blocks are kept in self.pending, which maps
+  # each qubit to the tuple (qubits, matrix) of its pending block.
+  # Pending blocks act on disjoint qubits and therefore commute. We only
+  # need to apply (flush) a block when a new gate would extend it to
+  # more than two qubits. A run of, eg., rx, rz, h, t gates on a qubit,
+  # or the three cx gates of a swap, then only costs a single pass
+  # over the state vector.
+  #
+  # Flushed blocks that are diagonal are not applied either. They are
+  # collected in self.phases and only multiplied into the state once
+  # a non-diagonal gate touches one of their qubits. Similarly, blocks
+  # that only permute amplitudes (X, CX, SWAP) are collected in
+  # self.permutations. The two layers are kept on disjoint qubits,
+  # so that they commute.
+  #
+  # Accessing psi flushes all pending gates, so that code outside
+  # this class always sees the full state.
+  @property
+  def psi(self) -> state.State:
+    self.flush()
+    self.apply_layers()
+    return self._psi
+
+  @psi.setter
+  def psi(self, psi: state.State) -> None:
+    # A new state replaces the old one, pending gates are obsolete.
+    self.pending = {}
+    self.phases.clear()
+    self.permutations.clear()
+    self._psi = psi
+
+  def fuse(self, qubits, gate: np.ndarray) -> None:
+    """Add a 1- or 2-qubit gate to the pending gates."""
+
+    blocks = []
+    for idx in qubits:
+      block = self.pending.get(idx)
+      if block and all(block is not b for b in blocks):
+        blocks.append(block)
+    order = list(qubits)
+    for block in blocks:
+      order += [idx for idx in block[0] if idx not in order]
+    if len(order) > 2:
+      self.flush(*qubits)
+      blocks, order = [], list(qubits)
+
+    # Accumulate in double precision, cast when flushing.
+    fused = _expand(np.asarray(gate, dtype=np.complex128), qubits, order)
+    for block in blocks:
+      fused = fused @ _expand(block[1], block[0], order)
+    block = (tuple(order), fused)
+    for idx in order:
+      self.pending[idx] = block
+
+  def flush(self, *qubits: int) -> None:
+    """Apply pending gates involving qubits (default: all)."""
+
+    for idx in (qubits if qubits else list(self.pending)):
+      block = self.pending.get(idx)
+      if block is None:
+        continue
+      for q in block[0]:
+        del self.pending[q]
+      self.apply_block(*block)
+
+  def apply_layer(self, layer, min_len: int, *qubits: int) -> None:
+    """Apply a layer if it involves qubits (default: always)."""
+
+    if not layer or (qubits and layer.qubits.isdisjoint(qubits)):
+      return
+    if len(layer) < min_len:
+      blocks = layer.blocks
+      layer.clear()
+      for block in blocks:
+        self.apply_block(*block, layer=False)
+      return
+    layer.apply(self._psi, self._psi.nbits)
+
+  def apply_layers(self, *qubits: int) -> None:
+    """Apply all layers that involve qubits (default: all)."""
+
+    self.apply_layer(self.phases, _MIN_PHASE_LAYER, *qubits)
+    self.apply_layer(self.permutations, _MIN_PERMUTATION_LAYER, *qubits)
+
+  def apply_block(self, qubits, gate: np.ndarray, layer: bool = True) -> None:
+    """Apply a fused gate with the cheapest fitting kernel."""
+
+    # Gates may cancel out, eg., two Hadamards in a row.
+    if _close(gate, np.identity(gate.shape[0])):
+      return
+    if layer and self._psi.nbits >= _MIN_LAYER_BITS:
+      if _diagonal(gate):
+        self.apply_layer(self.permutations, _MIN_PERMUTATION_LAYER, *qubits)
+        if self.phases.add(qubits, np.diagonal(gate)):
+          self.phases.blocks.append((qubits, gate))
+          return
+      else:
+        self.apply_layer(self.phases, _MIN_PHASE_LAYER, *qubits)
+        if self.permutations.add(qubits, gate):
+          self.permutations.blocks.append((qubits, gate))
+          return
+      self.apply_layers(*qubits)
+    nbits = self._psi.nbits
+    width = tensor.tensor_width()
+    threads = tensor.xgates_threads()
+    gate = gate.astype(tensor.tensor_type())
+    if len(qubits) == 1:
+      if _diagonal(gate):
+        applyd(self._psi, np.diagonal(gate).copy(), nbits, qubits[0],
+               width, threads)
+        return
+      apply1(self._psi, gate.reshape(4), nbits, qubits[0], width, threads)
+      return
+
+    # The block is a controlled gate if it leaves the control=|0>
+    # subspace of either qubit alone.
+    for ctl, tgt, op in [(qubits[0], qubits[1], gate),
+                         (qubits[1], qubits[0], _expand(gate, qubits,
+                                                        qubits[::-1]))]:
+      if (_close(op[:2, :2], np.identity(2)) and _close(op[:2, 2:], 0) and
+          _close(op[2:, :2], 0)):
+        sub = np.ascontiguousarray(op[2:, 2:])
+        if _diagonal(sub):
+          bit = 1 << (nbits - 1 - ctl)
+          applymcd(self._psi, np.diagonal(sub).copy(), nbits, bit, bit,
+                   tgt, width, threads)
+          return
+        applyc(self._psi, sub.reshape(4), nbits, ctl, tgt, width, threads)
+        return
+
+    # A general diagonal diag(a, b, c, d) is diag(a, b) on q1,
+    # followed by diag(c/a, d/b) on q1, controlled by q0.
+    if _diagonal(gate):
+      d = np.diagonal(gate)
+      bit = 1 << (nbits - 1 - qubits[0])
+      applyd(self._psi, d[:2].copy(), nbits, qubits[1], width, threads)
+      applymcd(self._psi, (d[2:] / d[:2]).astype(gate.dtype), nbits,
+               bit, bit, qubits[1], width, threads)
+      return
+    apply2(self._psi, gate.reshape(16), nbits, qubits[0], qubits[1],
+           width, threads)
+
+  def apply_mc(self, gate: ops.Operator, ctl, idx: int) -> None:
+    """Apply multi-controlled gate directly to the state (eager mode)."""
+
+    # Controllers are passed as in multi_control(), with control-by-0
+    # qubits as single-element lists. They are turned into bit masks
+    # over the state vector index for the applymc kernel.
+    if isinstance(idx, state.Reg):
+      assert len(idx) == 1, 'Controlled n-qbit register not supported'
+      idx = idx[0]
+    nbits = self._psi.nbits
+    qubits = []
+    ctl_mask = ctl_value_mask = 0
+    for c in ctl:
+      ctl_qubit, by_0 = self._ctl_by_0(c)
+      assert ctl_qubit < nbits and ctl_qubit != idx, 'Invalid qubit index'
+      bit = 1 << (nbits - 1 - ctl_qubit)
+      ctl_mask |= bit
+      if not by_0:
+        ctl_value_mask |= bit
+      qubits.append(ctl_qubit)
+    self.flush(*qubits, idx)
+    if _diagonal(gate):
+      self.apply_layer(self.permutations, _MIN_PERMUTATION_LAYER,
+                       *qubits, idx)
+      applymcd(self._psi, np.diagonal(gate).copy(), nbits, ctl_mask,
+               ctl_value_mask, idx, tensor.tensor_width(),
+               tensor.xgates_threads())
+      return
+    self.apply_layers(*qubits, idx)
+    applymc(self._psi, gate.reshape(4), nbits, ctl_mask, ctl_value_mask,
+            idx, tensor.tensor_width(), tensor.xgates_threads())
+
+  def apply_h(self, indices) -> None:
+    """Apply Hadamard gates to many qubits at once (eager mode)."""
+
+    nbits = self._psi.nbits
+    mask = 0
+    for idx in indices:
+      assert idx < nbits, 'Invalid qubit index'
+      mask |= 1 << (nbits - 1 - idx)
+    self.flush(*indices)
+    self.apply_layers(*indices)
+    applyh(self._psi, nbits, mask, tensor.tensor_width(),
+           tensor.xgates_threads())
 
   class scope:
     """Scope object to allow grouping of gates in the output."""
@@ -188,13 +447,23 @@ class qc:
     if isinstance(idx_set, (state.Reg, list)):
       indices += idx_set[:]
 
+    # A layer of Hadamard gates, as they start most algorithms, is
+    # applied as a single Walsh-Hadamard transform.
+    if (self.eager and len(set(indices)) > 1 and
+        len(set(indices)) == len(indices) and
+        _close(gate, ops.Hadamard())):
+      if self.build_ir:
+        for idx in indices:
+          self.ir.single(name, idx, gate, val)
+      self.apply_h(indices)
+      return
+
     for idx in indices:
       if self.build_ir:
         self.ir.single(name, idx, gate, val)
       if self.eager:
-        assert idx < self.psi.nbits, 'Invalid qubit index'
-        apply1(self.psi, gate.reshape(4), self.psi.nbits, idx,
-               tensor.tensor_width())
+        assert idx < self._psi.nbits, 'Invalid qubit index'
+        self.fuse((idx,), gate)
 
   def applyc(self, gate: ops.Operator, ctl: int, idx: int,
              name: str = None, *, val: float = None):
@@ -209,9 +478,10 @@ class qc:
     if self.build_ir:
       self.ir.controlled(name, ctl_qubit, idx, gate, val)
     if self.eager:
-      assert idx < self.psi.nbits, 'Invalid qubit index'
-      applyc(self.psi, gate.reshape(4), self.psi.nbits, ctl_qubit, idx,
-             tensor.tensor_width())
+      assert idx < self._psi.nbits, 'Invalid qubit index'
+      # A controller outside of the state can never be |1>.
+      if 0 <= ctl_qubit < self._psi.nbits:
+        self.fuse((ctl_qubit, idx), _controlled(gate))
     self.x(ctl_qubit, by_0)
 
   def cx0(self, idx0: int, idx1: int):
@@ -227,6 +497,14 @@ class qc:
   def ccu(self, idx0: int, idx1: int, idx2: int, op: ops.Operator, desc=''):
     """Sleator-Weinfurter Construction for general operators."""
 
+    # In eager mode, we simulate the doubly-controlled gate directly.
+    # The construction below is only needed for the IR.
+    if self.eager:
+      self.apply_mc(op, [idx0, idx1], idx2)
+    if not self.build_ir:
+      return
+    eager, self.eager = self.eager, False
+
     # Enable Control-By-0 (if idx is being passes as [idx])
     i0, c0_by_0 = self._ctl_by_0(idx0)
     i1, c1_by_0 = self._ctl_by_0(idx1)
@@ -244,6 +522,7 @@ class qc:
 
       self.x(i1, c1_by_0)
       self.x(i0, c0_by_0)
+    self.eager = eager
 
   def ccx(self, idx0: int, idx1: int, idx2: int):
     self.ccu(idx0, idx1, idx2, ops.PauliX(), 'ccx')
@@ -281,7 +560,52 @@ class qc:
   #  Appplying a random unitary is possible, but it is not a
   #  1- or 2-qubit gate, hence slow. Avoid using it (unless unavoidable).
   def unitary(self, op, idx):
-    self.psi = ops.Operator(op)(self.psi, idx)
+    op = ops.Operator(op)
+    self.cunitary([], list(range(idx, idx + op.nbits)), op)
+
+  def cunitary(self, ctl, targets, op, name: str = 'u'):
+    """Apply a dense operator to targets, controlled by all of ctl."""
+
+    # Controllers are passed as in multi_control(), with control-by-0
+    # qubits as single-element lists. Targets need not be adjacent,
+    # targets[0] corresponds to the highest-order bit of op.
+    if isinstance(ctl, (int, state.Reg)):
+      ctl = [ctl] if isinstance(ctl, int) else ctl[:]
+    if isinstance(targets, (int, state.Reg)):
+      targets = [targets] if isinstance(targets, int) else targets[:]
+    op = ops.Operator(op)
+    assert op.nbits == len(targets), 'Operator and targets differ in size.'
+    if self.build_ir:
+      self.ir.unitary(name, list(ctl), list(targets), op)
+    if self.eager:
+      self.apply_cu(op, ctl, targets)
+
+  def apply_cu(self, op: ops.Operator, ctl, targets) -> None:
+    """Apply controlled dense operator directly to the state (eager mode)."""
+
+    # With the state viewed as a tensor with one axis per qubit,
+    # fixing the axes of the controllers selects the subspace in which
+    # all of them are satisfied. This, and moving the target axes to the
+    # front, only creates views. A single matmul then costs
+    # O(2^k * 2^(n - #ctl)), instead of O(4^n) for a full operator
+    # with all the identities between the qubits.
+    nbits = self._psi.nbits
+    qubits = [self._ctl_by_0(c)[0] for c in ctl] + list(targets)
+    assert len(set(qubits)) == len(qubits), 'Qubits must be distinct.'
+    assert all(0 <= q < nbits for q in qubits), 'Invalid qubit index'
+    self.flush(*qubits)
+    self.apply_layers(*qubits)
+
+    index = [slice(None)] * nbits
+    for c in ctl:
+      ctl_qubit, by_0 = self._ctl_by_0(c)
+      index[ctl_qubit] = 0 if by_0 else 1
+    rest = [q for q in range(nbits) if isinstance(index[q], slice)]
+    view = self._psi.reshape([2] * nbits)[tuple(index)]
+    view = np.moveaxis(view, [rest.index(t) for t in targets],
+                       range(len(targets)))
+    res = np.asarray(op, dtype=self._psi.dtype) @ view.reshape(op.shape[0], -1)
+    view[...] = res.reshape(view.shape)
 
   # --- Measure ----------------------------------------------------
   def measure_bit(self, idx: int, tostate: int = 0,
@@ -291,6 +615,56 @@ class qc:
     prob, self.psi = ops.Measure(self.psi, idx, tostate, collapse)
     return prob, self.psi
 
+  def reg_probabilities(self, reg) -> np.ndarray:
+    """Return the histogram of a register's (integer) values."""
+
+    return self.psi.probabilities(reg)
+
+  def measure_reg(self, reg, tostate: int = None,
+                  collapse: bool = True) -> Tuple[int, np.ndarray]:
+    """Measure a register, return its value and the histogram."""
+
+    # Without tostate, the value is drawn from the histogram. The
+    # collapse is done in place, it keeps the amplitudes of the slice
+    # in which reg holds the value and scales them by 1/sqrt(prob).
+    probs = self.reg_probabilities(reg)
+    if tostate is None:
+      tostate = int(np.random.choice(len(probs), p=probs / probs.sum()))
+    if not collapse:
+      return tostate, probs
+    assert probs[tostate] > 1e-20, 'Measurement collapses to 0.0.'
+    nbits = self._psi.nbits
+    index = [slice(None)] * nbits
+    for qubit, bit in zip(reg, helper.val2bits(tostate, len(reg))):
+      index[qubit] = bit
+    view = self._psi.reshape([2] * nbits)
+    keep = view[tuple(index)] / np.sqrt(probs[tostate])
+    view[...] = 0
+    view[tuple(index)] = keep
+    return tostate, probs
+
+  def sample(self, shots: int, qubits=None, *, counts: bool = False,
+             seed=None):
+    """Sample measurement outcomes for many shots, without collapse."""
+
+    # Outcomes are bit-packed, the value of qubits (default: all) with
+    # qubits[0] as the highest-order bit. All shots are drawn at once
+    # from the histogram, either as a multinomial (for counts, a dict
+    # of value: count) or by searching uniform random numbers in the
+    # cumulative probabilities. seed can be an int or a np.random
+    # Generator.
+    if qubits is None:
+      qubits = range(self.nbits)
+    probs = self.reg_probabilities(qubits)
+    probs /= probs.sum()
+    rng = np.random.default_rng(seed)
+    if counts:
+      hist = rng.multinomial(shots, probs)
+      return {int(val): int(hist[val]) for val in np.nonzero(hist)[0]}
+    outcomes = np.searchsorted(np.cumsum(probs), rng.random(shots),
+                               side='right')
+    return np.minimum(outcomes, len(probs) - 1)
+
   def pauli_expectation(self, idx: int):
     """We can compute the Pauli expectation value from probabilities."""
 
@@ -320,6 +694,16 @@ class qc:
   def qft(self, reg, with_swaps: bool = False) -> None:
     """QFT."""
 
+    self.fourier('qft', reg, with_swaps)
+
+  def inverse_qft(self, reg, with_swaps: bool = False) -> None:
+    """Inverse QFT."""
+
+    self.fourier('inverse_qft', reg, with_swaps)
+
+  def qft_gates(self, reg, with_swaps: bool = False) -> None:
+    """QFT, as individual gates."""
+
     for i in reversed(range(len(reg))):
       self.h(reg[i])
       for j in reversed(range(i)):
@@ -327,8 +711,8 @@ class qc:
     if with_swaps:
       self.flip(reg)
 
-  def inverse_qft(self, reg, with_swaps: bool = False) -> None:
-    """Inverse QFT."""
+  def inverse_qft_gates(self, reg, with_swaps: bool = False) -> None:
+    """Inverse QFT, as individual gates."""
 
     if with_swaps:
       self.flip(reg)
@@ -338,11 +722,73 @@ class qc:
         for y in range(idx, -1, -1):
           self.cu1(reg[idx + 1], reg[y], -np.pi / 2 ** (idx + 1 - y))
 
+  def fourier(self, name: str, reg, with_swaps: bool) -> None:
+    """Add (inverse) QFT as a single macro to the IR, simulate via FFT."""
+
+    # The QFT consists of O(n^2) gates, each one a pass over the state.
+    # In the IR, it becomes a single macro node, which dumpers expand
+    # to the gates (see ir.expand). In eager mode, a QFT on a block of
+    # adjacent qubits is simulated with numpy's FFT instead.
+    qubits = list(reg)
+    gates = name + '_gates'
+    if self.build_ir:
+      body = qc(name, eager=False)
+      getattr(body, gates)(qubits, with_swaps)
+      self.ir.macro(name, qubits, with_swaps, body.ir)
+    if not self.eager:
+      return
+    if qubits and qubits == list(range(qubits[0], qubits[0] + len(qubits))):
+      self.apply_qft(qubits, name == 'inverse_qft', with_swaps)
+      return
+    build_ir = self.build_ir
+    self.build_ir = False
+    getattr(self, gates)(qubits, with_swaps)
+    self.build_ir = build_ir
+
+  def apply_qft(self, qubits, inverse: bool, with_swaps: bool) -> None:
+    """Apply (inverse) QFT on adjacent qubits via FFT (eager mode)."""
+
+    # The gates of qft() compute the inverse DFT (with sign +1) of the
+    # bit-reversed register value, the swaps reverse the result.
+    # inverse_qft() is the exact inverse of that.
+    self.flush(*qubits)
+    self.apply_layers(*qubits)
+    n = len(qubits)
+    rev = helper.bit_reversal(n)
+    view = self._psi.reshape(1 << qubits[0], 1 << n, -1)
+    if inverse:
+      res = np.fft.fft(view[:, rev, :] if with_swaps else view,
+                       axis=1, norm='ortho')[:, rev, :]
+    else:
+      res = np.fft.ifft(view[:, rev, :], axis=1, norm='ortho')
+      if with_swaps:
+        res = res[:, rev, :]
+    view[...] = res
+
   def multi_control(self, ctl, idx1, aux, gate, desc: str = ''):
     """Multi-controlled gate, using aux as ancilla."""
 
     if aux:
       assert len(aux) >= len(ctl)-1, 'Incorrect number of ancilla qubits.'
+    if isinstance(ctl, state.Reg):
+      ctl = ctl[:]
+
+    # In eager mode, gates with more than one controller are simulated
+    # directly with the applymc kernel. This needs no ancillae, aux
+    # may be None if no IR is being built. The construction with
+    # ancillae below is only used for the IR (and the output generated
+    # from it).
+    if not self.eager or len(ctl) < 2:
+      self.multi_control_ir(ctl, idx1, aux, gate, desc)
+      return
+    self.apply_mc(gate, ctl, idx1)
+    if self.build_ir:
+      self.eager = False
+      self.multi_control_ir(ctl, idx1, aux, gate, desc)
+      self.eager = True
+
+  def multi_control_ir(self, ctl, idx1, aux, gate, desc: str = ''):
+    """Multi-controlled gate, constructed with ancillae."""
 
     # This is a simple version that requires n-1 ancillaries, instead
     # of possibly n-2. The benefit is that the gate can be used as a
@@ -405,6 +851,12 @@ class qc:
     # using this circuit's eager mode.
     #
     for gate in qc_parm.ir.gates:
+      if gate.is_macro():
+        getattr(self, gate.name)([q + offset for q in gate.qubits], gate.val)
+      if gate.is_unitary():
+        self.cunitary([_offset(c, offset) for c in gate.ctls],
+                      [t + offset for t in gate.targets], gate.gate,
+                      gate.name)
       if gate.is_single():
         self.apply1(gate.gate, gate.idx0 + offset, gate.name, val=gate.val)
       if gate.is_ctl():
@@ -448,6 +900,13 @@ class qc:
     #
     newqc = qc(self.name, eager=False)
     for gate in self.ir.gates[::-1]:
+      if gate.is_macro():
+        getattr(newqc, _INVERSE_MACRO[gate.name])(gate.qubits, gate.val)
+        continue
+      if gate.is_unitary():
+        newqc.cunitary(gate.ctls, gate.targets, gate.gate.adjoint(),
+                       gate.name + '*')
+        continue
       val = -gate.val if gate.val else None
       if gate.is_single():
         newqc.apply1(gate.gate.adjoint(), gate.idx0, gate.name + '*', val=val)
@@ -476,7 +935,7 @@ class qc:
 
     assert not self.eager, 'control_by() used in non-eager circuit.'
     res = ir.Ir()
-    for _, gate in enumerate(self.ir.gates):
+    for _, gate in enumerate(self.ir.expand().gates):
       if gate.is_single():
         gate.to_ctl(ctl)
         res.add_node(gate)
@@ -488,6 +947,8 @@ class qc:
         )
         for gate in sub.ir.gates:
           res.add_node(gate)
+      if gate.is_unitary():
+        res.unitary(gate.name, [ctl] + gate.ctls, gate.targets, gate.gate)
     self.ir = res
 
   def sub(self, name: str = ''):
@@ -3,10 +3,14 @@ import math
 
 from absl.testing import absltest
 import numpy as np
+from scipy.stats import unitary_group
 
 from src.lib import circuit
+from src.lib import dumpers
+from src.lib import helper
 from src.lib import ops
 from src.lib import state
+from src.lib import tensor
 
 
 class CircuitTest(absltest.TestCase):
@@ -106,6 +110,179 @@ class CircuitTest(absltest.TestCase):
     if not psi.is_close(qc.psi):
       raise AssertionError('Numerical Problems')
 
+  def test_threads(self):
+    # libxgates only splits a kernel over threads for states of at
+    # least 2^16 amplitudes. Each amplitude is computed the same way
+    # on any thread, so the results must be bit-identical.
+    nbits = 17
+    width = tensor.tensor_width()
+    dtype = tensor.tensor_type()
+    gate1 = ops.RotationX(0.3).astype(dtype).reshape(4)
+    gate2 = ops.Operator(np.kron(ops.Yroot(), ops.Tgate()) @
+                         ops.Cnot(0, 1)).astype(dtype).reshape(16)
+    diag = np.array([1.0, np.exp(0.7j)], dtype=dtype)
+    ctl_mask = (1 << (nbits - 1)) | (1 << 3)
+    kernels = [
+        lambda psi, t: circuit.apply1(psi, gate1, nbits, 9, width, t),
+        lambda psi, t: circuit.applyc(psi, gate1, nbits, 16, 0, width, t),
+        lambda psi, t: circuit.apply2(psi, gate2, nbits, 2, 14, width, t),
+        lambda psi, t: circuit.applymc(psi, gate1, nbits, ctl_mask,
+                                       1 << 3, 7, width, t),
+        lambda psi, t: circuit.applyd(psi, diag, nbits, 4, width, t),
+        lambda psi, t: circuit.applyh(psi, nbits, 0b10110000001100101,
+                                      width, t),
+    ]
+    psi = state.rand_state(nbits)
+    for kernel in kernels:
+      expected = psi.copy()
+      kernel(expected, 1)
+      self.assertFalse(np.array_equal(expected, psi))
+      for threads in [4, 0]:
+        res = psi.copy()
+        kernel(res, threads)
+        self.assertTrue(np.array_equal(res, expected))
+
+  def test_fusion(self):
+    psi = state.bitstring(0, 1, 1, 0)
+    qc = circuit.qc()
+    qc.bitstring(0, 1, 1, 0)
+
+    gates = [ops.Hadamard(), ops.Tgate(), ops.RotationX(0.4),
+             ops.Vgate(), ops.RotationZ(1.2), ops.Yroot()]
+    for i in range(4):
+      for gate in gates:
+        qc.apply1(gate, i, 'gate')
+        psi.apply1(gate, i)
+    self.assertLen(qc.pending, 4)
+
+    # Controlled gates fuse with the pending gates on their qubits.
+    qc.cx(0, 1)
+    psi.applyc(ops.PauliX(), 0, 1)
+    self.assertLen(qc.pending, 4)
+    self.assertIs(qc.pending[0], qc.pending[1])
+
+    # A gate on qubits 1 and 2 must flush the block on qubits 0 and 1.
+    qc.cu1(2, 1, 0.3)
+    psi.applyc(ops.U1(0.3), 2, 1)
+    self.assertNotIn(0, qc.pending)
+    self.assertIs(qc.pending[1], qc.pending[2])
+
+    # Accessing psi must flush all pending gates.
+    self.assertTrue(psi.is_close(qc.psi))
+    self.assertEmpty(qc.pending)
+
+  def test_fusion_swap(self):
+    qc = circuit.qc()
+    qc.bitstring(1, 1, 0, 1, 1)
+    qc.h(0)
+    qc.swap(0, 3)
+    qc.swap(1, 2)
+    self.assertLen(qc.pending, 4)
+    self.assertTrue(qc.psi.is_close(
+        ops.Hadamard()(state.bitstring(1, 0, 1, 1, 1), 3)))
+
+  def test_fusion_diagonal(self):
+    psi = state.bitstring(0, 0, 0, 0)
+    qc = circuit.qc()
+    qc.bitstring(0, 0, 0, 0)
+    for i in range(4):
+      qc.h(i)
+      psi.apply1(ops.Hadamard(), i)
+
+    # Blocks of diagonal gates are applied with the diagonal kernels,
+    # on one qubit, controlled, and as a general two-qubit diagonal.
+    qc.flush()
+    qc.z(0)
+    qc.t(1)
+    qc.rz(2, 0.3)
+    qc.cu1(3, 2, 0.7)
+    qc.rz(0, 1.1)
+    qc.crz(1, 0, 0.4)
+    qc.u1(1, 0.2)
+    psi.apply1(ops.PauliZ(), 0)
+    psi.apply1(ops.Tgate(), 1)
+    psi.apply1(ops.RotationZ(0.3), 2)
+    psi.applyc(ops.U1(0.7), 3, 2)
+    psi.apply1(ops.RotationZ(1.1), 0)
+    psi.applyc(ops.RotationZ(0.4), 1, 0)
+    psi.apply1(ops.U1(0.2), 1)
+    self.assertTrue(psi.is_close(qc.psi))
+
+  def test_phase_layer(self):
+    nbits = 12
+    psi = state.zeros(nbits)
+    qc = circuit.qc()
+    qc.reg(nbits, 0)
+    for i in range(nbits):
+      qc.h(i)
+      psi.apply1(ops.Hadamard(), i)
+
+    # A QFT-like ladder of controlled rotations is only collected.
+    for i in range(nbits):
+      for j in range(i + 1, nbits):
+        qc.cu1(j, i, np.pi / 2 ** (j - i))
+        psi.applyc(ops.U1(np.pi / 2 ** (j - i)), j, i)
+      qc.t(i)
+      psi.apply1(ops.Tgate(), i)
+    qc.flush()
+    self.assertGreaterEqual(len(qc.phases), nbits)
+
+    # A non-diagonal gate materializes the layer.
+    qc.h(0)
+    psi.apply1(ops.Hadamard(), 0)
+    qc.flush()
+    self.assertEmpty(qc.phases)
+    self.assertTrue(psi.is_close(qc.psi))
+
+  def test_permutation_layer(self):
+    nbits = 12
+    psi = state.zeros(nbits)
+    qc = circuit.qc()
+    qc.reg(nbits, 0)
+    for i in range(nbits):
+      qc.ry(i, 0.1 * (i + 1))
+      psi.apply1(ops.RotationY(0.1 * (i + 1)), i)
+
+    # Runs of X, CX, and SWAP gates are only collected.
+    for i in range(nbits - 1):
+      qc.x(i)
+      qc.cx(i, i + 1)
+      qc.swap(i, nbits - 1 - i)
+      psi.apply1(ops.PauliX(), i)
+      psi.applyc(ops.PauliX(), i, i + 1)
+      j = nbits - 1 - i
+      for ctl, tgt in [(i, j), (j, i), (i, j)]:
+        psi.applyc(ops.PauliX(), ctl, tgt)
+    qc.flush()
+    self.assertGreaterEqual(len(qc.permutations), nbits)
+
+    # Diagonal gates on the permuted qubits must apply the layer first.
+    qc.t(3)
+    psi.apply1(ops.Tgate(), 3)
+    qc.flush()
+    self.assertEmpty(qc.permutations)
+
+    # Multi-controlled gates on the permuted qubits, too.
+    qc.cx(2, 5)
+    qc.ccx(0, 1, 5)
+    psi.applyc(ops.PauliX(), 2, 5)
+    psi = ops.ControlledU(0, 1, ops.ControlledU(1, 5, ops.PauliX()))(psi)
+    self.assertTrue(psi.is_close(qc.psi))
+
+  def test_hadamard_layer(self):
+    nbits = 15
+    for qubits in [list(range(nbits)), [0, 3, 4, 5, 9, 14], [1, 2, 13]]:
+      qc = circuit.qc()
+      ref = circuit.qc()
+      for c in [qc, ref]:
+        c.reg(nbits, 0)
+        for i in range(nbits):
+          c.ry(i, 0.1 * (i + 1))
+      qc.h(qubits)
+      for i in qubits:
+        ref.h(i)
+      self.assertTrue(qc.psi.is_close(ref.psi))
+
   def test_circuit_of_circuit(self):
     c1 = circuit.qc('c1', eager=False)
     c1.reg(6, 0)
@@ -189,6 +366,29 @@ class CircuitTest(absltest.TestCase):
     c.multi_control(ctl, 3, aux, ops.PauliX(), 'single')
     self.assertGreater(c.psi.prob(1, 0, 0, 1, 0, 0), 0.99)
 
+  def test_multi_native(self):
+    # Compare the native multi-controlled gates against a run
+    # of the ancilla-based construction from the IR.
+    for ctl in [[0, 1], [[0], 2], [0, [1], 3], [[3], [2], [1], 0]]:
+      for gate in [ops.PauliX(), ops.RotationY(0.7), ops.U1(0.5)]:
+        c = circuit.qc('ir', eager=False)
+        c.reg(5, 0)
+        aux = c.reg(3)
+        for i in range(5):
+          c.rx(i, 0.3 * (i + 1))
+        c.multi_control(ctl, 4, aux, gate, 'multi')
+        c.run()
+
+        qc = circuit.qc('eager')
+        qc.reg(5, 0)
+        for i in range(5):
+          qc.rx(i, 0.3 * (i + 1))
+        qc.multi_control(ctl, 4, None, gate, 'multi')
+        qc.qubit(1.0)
+        qc.qubit(1.0)
+        qc.qubit(1.0)
+        self.assertTrue(qc.psi.is_close(c.psi))
+
   def test_x_error_first_approach(self):
     error_qubit = 0
 
@@ -380,6 +580,138 @@ class CircuitTest(absltest.TestCase):
     self.assertLess(abs(qc0.psi.ampl(0, 1, 0) - qc1.psi.ampl(1, 1, 0)), 1e-5)
     self.assertLess(abs(qc0.psi.ampl(0, 1, 1) - qc1.psi.ampl(1, 1, 1)), 1e-5)
 
+  def test_qft_fft(self):
+    nbits = 7
+    for name in ['qft', 'inverse_qft']:
+      for with_swaps in [False, True]:
+        for reg in [[0, 1, 2, 3], [2, 3, 4, 5, 6], [1, 3, 4]]:
+          qc = circuit.qc()
+          ref = circuit.qc()
+          for c in [qc, ref]:
+            c.reg(nbits, 0)
+            for i in range(nbits):
+              c.ry(i, 0.2 * (i + 1))
+          getattr(qc, name)(reg, with_swaps)
+          getattr(ref, name + '_gates')(reg, with_swaps)
+          self.assertTrue(qc.psi.is_close(ref.psi))
+
+  def test_qft_macro(self):
+    c = circuit.qc('qft', eager=False)
+    reg = c.reg(4, 0, name='q')
+    c.h(reg)
+    c.qft(reg, True)
+    self.assertLen(c.ir.gates, 5)
+    self.assertTrue(c.ir.gates[4].is_macro())
+    self.assertEqual(c.ir.ngates, 4 + 10 + 6)
+
+    # Dumpers see the expanded gates.
+    expanded = c.ir.expand()
+    self.assertEqual(expanded.ngates, 4 + 10 + 6)
+    self.assertFalse(any(node.is_macro() for node in expanded.gates))
+    self.assertIn('cu1(pi/8) q[3],q[0];', dumpers.qasm(c.ir))
+
+    # Running the circuit and its inverse restores the initial state.
+    qc = circuit.qc('main')
+    qc.reg(4, 0)
+    qc.qc(c)
+    ref = circuit.qc('ref')
+    ref.reg(4, 0)
+    ref.h(list(range(4)))
+    ref.qft_gates(list(range(4)), True)
+    self.assertTrue(qc.psi.is_close(ref.psi))
+    qc.qc(c.inverse())
+    self.assertTrue(qc.psi.is_close(state.zeros(4)))
+
+  def test_cunitary(self):
+    nbits = 5
+    u = ops.Operator(unitary_group.rvs(4))
+    ctl, targets = [0, [3]], [4, 1]
+
+    c = circuit.qc('cu', eager=False)
+    c.reg(nbits, 0)
+    c.cunitary(ctl, targets, u)
+    self.assertLen(c.ir.gates, 1)
+    self.assertTrue(c.ir.gates[0].is_unitary())
+    self.assertEqual(c.ir.ngates, 1)
+
+    qc = circuit.qc('main')
+    qc.reg(nbits, 0)
+    for i in range(nbits):
+      qc.ry(i, 0.3 * (i + 1))
+    psi = qc.psi.copy()
+    qc.qc(c)
+
+    ref = state.State(np.zeros(1 << nbits))
+    for idx in range(1 << nbits):
+      bits = helper.val2bits(idx, nbits)
+      if bits[0] != 1 or bits[3] != 0:
+        ref[idx] += psi[idx]
+        continue
+      row = 2 * bits[4] + bits[1]
+      for col in range(4):
+        bits[4], bits[1] = col >> 1, col & 1
+        ref[idx] += u[row, col] * psi[helper.bits2val(bits)]
+    self.assertTrue(qc.psi.is_close(ref))
+
+    qc.qc(c.inverse())
+    self.assertTrue(qc.psi.is_close(psi))
+
+    # Uncontrolled, on adjacent qubits, this is qc.unitary.
+    qc.unitary(u, 2)
+    self.assertTrue(qc.psi.is_close(u(psi, 2)))
+
+  def test_measure_reg(self):
+    qc = circuit.qc('measure')
+    reg = qc.reg(3, 0)
+    other = qc.reg(2, 0)
+    qc.h(reg[0])
+    qc.h(other)
+    qc.cx(reg[0], reg[2])
+
+    # |000> and |101>, each with probability 1/2.
+    probs = qc.reg_probabilities(reg)
+    self.assertTrue(np.allclose(probs, [0.5, 0, 0, 0, 0, 0.5, 0, 0]))
+    self.assertTrue(np.allclose(qc.reg_probabilities(reg[::-1]),
+                                [0.5, 0, 0, 0, 0, 0.5, 0, 0]))
+    self.assertTrue(np.allclose(qc.reg_probabilities([reg[2], other[0]]),
+                                [0.25, 0.25, 0.25, 0.25]))
+
+    val, _ = qc.measure_reg(reg, collapse=False)
+    self.assertIn(val, [0, 5])
+    self.assertTrue(np.allclose(qc.reg_probabilities(reg), probs))
+
+    val, hist = qc.measure_reg(reg, tostate=5)
+    self.assertEqual(val, 5)
+    self.assertTrue(np.allclose(hist, probs))
+    self.assertTrue(qc.psi.is_close(state.bitstring(1, 0, 1) *
+                                    state.plus(2)))
+
+    val, _ = qc.measure_reg(other)
+    self.assertIn(val, range(4))
+    self.assertAlmostEqual(qc.reg_probabilities(other)[val], 1.0, places=5)
+
+  def test_sample(self):
+    qc = circuit.qc('sample')
+    qc.reg(3, 0)
+    qc.ry(0, 2 * np.arccos(np.sqrt(0.3)))
+    qc.x(2)
+
+    # Outcomes |001> and |101>, with probabilities 0.3 and 0.7.
+    shots = 20000
+    outcomes = qc.sample(shots, seed=1)
+    self.assertLen(outcomes, shots)
+    self.assertEqual(set(outcomes.tolist()), {1, 5})
+    self.assertAlmostEqual(np.mean(outcomes == 1), 0.3, delta=0.02)
+    self.assertTrue(np.array_equal(outcomes, qc.sample(shots, seed=1)))
+
+    hist = qc.sample(shots, [2, 0], counts=True, seed=2)
+    self.assertEqual(set(hist), {2, 3})
+    self.assertEqual(sum(hist.values()), shots)
+    self.assertAlmostEqual(hist[2] / shots, 0.3, delta=0.02)
+
+    # Sampling does not collapse the state.
+    self.assertAlmostEqual(qc.reg_probabilities([0])[0], 0.3, places=5)
+
   def test_state_constructor(self):
     psi = state.bitstring(0, 0)
     psi = ops.Hadamard()(psi)
@@ -20,6 +20,7 @@ def reg2str(ir, idx):
 def qasm(ir) -> str:
   """Dump IR in qasm format."""
 
+  ir = ir.expand()
   res = 'OPENQASM 2.0;\n'
   for regs in ir.regset:
     res += f'qreg {regs[0]}[{regs[1]}];\n'
@@ -40,6 +41,7 @@ def qasm(ir) -> str:
 def libq(ir) -> str:
   """Dump IR to a compilable C++ program with libq."""
 
+  ir = ir.expand()
   res = (
       '// This file was generated by qc.dump_to_file()\n\n'
       + '#include <math.h>\n'
@@ -89,6 +91,7 @@ def libq(ir) -> str:
 def cirq(ir) -> str:
   """Dump IR to a Cirq Python file."""
 
+  ir = ir.expand()
   res = (
       '# This file was generated by qc.dump_to_file()\n\n'
       + 'import cirq\n'
@@ -164,6 +167,7 @@ def cirq(ir) -> str:
 def latex(ir) -> str:
   """Minimal Dumper to quantikz Latex Format."""
 
+  ir = ir.expand()
   carr: List[List[str]] = []
 
   def new_col():
@@ -238,6 +242,7 @@ def latex(ir) -> str:
 def totext(ir) -> str:
   """Minimal Dumper to ASCII text."""
 
+  ir = ir.expand()
   def mkname(op):
     name = op.name.upper()
     if name == 'CZ':
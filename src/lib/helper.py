@@ -31,6 +31,18 @@ def val2bits(val: int, nbits: int):
   return [int(c) for c in format(val, f'0{nbits}b')]
 
 
+def bit_reversal(nbits: int) -> np.ndarray:
+  """Return, for each nbits-bit value, the value with reversed bits."""
+
+  # Doubling: with rev for n-1 bits, k and k + 2^(n-1) (the values
+  # with the highest of n bits clear and set) map to 2 * rev[k] and
+  # 2 * rev[k] + 1, as the highest bit becomes the lowest one.
+  rev = np.zeros(1, dtype=np.int64)
+  for _ in range(nbits):
+    rev = np.concatenate([2 * rev, 2 * rev + 1])
+  return rev
+
+
 def bits2frac(bits: Tuple[int, ...]) -> float:
   """For given bits, compute the binary fraction."""
 
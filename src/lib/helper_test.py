@@ -17,6 +17,12 @@ class HelpersTest(absltest.TestCase):
     val = helper.bits2val(bits)
     self.assertEqual(val, 6)
 
+  def test_bit_reversal(self):
+    rev = helper.bit_reversal(4)
+    for val in range(16):
+      self.assertEqual(rev[val],
+                       helper.bits2val(helper.val2bits(val, 4)[::-1]))
+
   def test_density_to_cartesian(self):
     """Test density to cartesian conversion."""
 
@@ -14,20 +14,27 @@ class Op(enum.Enum):
   CTL = 2
   SECTION = 3
   END_SECTION = 4
+  MACRO = 5
+  UNITARY = 6
 
 
 class Node:
   """Single node in the IR."""
 
-  def __init__(self, opcode, name, idx0, idx1, gate, val):
+  def __init__(self, opcode, name, idx0, idx1, gate, val, body=None):
     self._opcode = opcode
     self._name = name
     self._idx0 = idx0
     self._idx1 = idx1
     self._gate = gate
     self._val = val
+    self._body = body
 
   def __str__(self):
+    if self.is_macro():
+      return '{}({})'.format(self.name, self.qubits)
+    if self.is_unitary():
+      return '{}({}, {})'.format(self.name, self.ctls, self.targets)
     s = ''
     if self.is_single():
       s = '{}({})'.format(self.name, self.idx0)
@@ -62,6 +69,12 @@ class Node:
   def is_end_section(self):
     return self._opcode == Op.END_SECTION
 
+  def is_macro(self):
+    return self._opcode == Op.MACRO
+
+  def is_unitary(self):
+    return self._opcode == Op.UNITARY
+
   @property
   def opcode(self):
     return self._opcode
@@ -102,6 +115,30 @@ class Node:
   def gate(self):
     return self._gate
 
+  @property
+  def qubits(self):
+    if not self.is_macro():
+      raise AssertionError('Invalid use of qubits(), must be macro.')
+    return self._idx0
+
+  @property
+  def ctls(self):
+    if not self.is_unitary():
+      raise AssertionError('Invalid use of ctls(), must be unitary.')
+    return self._idx0
+
+  @property
+  def targets(self):
+    if not self.is_unitary():
+      raise AssertionError('Invalid use of targets(), must be unitary.')
+    return self._idx1
+
+  @property
+  def body(self):
+    if not self.is_macro():
+      raise AssertionError('Invalid use of body(), must be macro.')
+    return self._body
+
 
 class Ir:
   """Compiler IR."""
@@ -143,6 +180,41 @@ class Ir:
     self.gates.append(Node(Op.CTL, name, idx0, idx1, gate, val))
     self._ngates += 1
 
+  def macro(self, name, qubits, val, body):
+    """Add a macro on qubits, with its expansion 'body' (an Ir)."""
+
+    # Macros, such as the QFT, are recorded as a single node, so that
+    # an eager qc can simulate them as a whole. Dumpers and other
+    # passes that only understand gates use expand() below.
+    self.gates.append(Node(Op.MACRO, name, qubits, None, None, val, body))
+    self._ngates += body.ngates
+
+  def unitary(self, name, ctls, targets, gate):
+    """Add a dense gate on targets, controlled by all of ctls."""
+
+    # There is no decomposition into 1- and 2-qubit gates for an
+    # arbitrary unitary, so the node stays as is. Dumpers only emit
+    # the gates they understand and skip these nodes.
+    self.gates.append(Node(Op.UNITARY, name, ctls, targets, gate, None))
+    self._ngates += 1
+
+  def expand(self):
+    """Return an Ir with all macros replaced by their gates."""
+
+    if not any(node.is_macro() for node in self.gates):
+      return self
+    res = Ir()
+    res.regs = self.regs
+    res.nregs = self.nregs
+    res.regset = self.regset
+    for node in self.gates:
+      nodes = node.body.expand().gates if node.is_macro() else [node]
+      for sub in nodes:
+        res.gates.append(sub)
+        if sub.is_gate():
+          res._ngates += 1
+    return res
+
   def section(self, desc):
     self.gates.append(Node(Op.SECTION, desc, 0, 0, None, None))
 
@@ -2,6 +2,7 @@
 import math
 
 from absl.testing import absltest
+import numpy as np
 
 from src.lib import ops
 from src.lib import state
@@ -21,6 +22,34 @@ class MeasureTest(absltest.TestCase):
     p0, _ = ops.Measure(psi2, 0)
     self.assertTrue(math.isclose(p0, 1.0, abs_tol=1e-6))
 
+  def test_measure_projector(self):
+    nbits = 5
+    psi = state.rand_state(nbits)
+    for qubits, tostate in [(0, 1), (3, 0), (4, 1), ([1, 3], 2),
+                            ([4, 0, 2], 5), ([2, 1], (0, 1))]:
+      bits = [qubits] if isinstance(qubits, int) else qubits
+      value = tostate
+      if isinstance(tostate, tuple):
+        value = 2 * tostate[0] + tostate[1]
+      # The projector onto qubits being in value, as a diagonal.
+      proj = np.ones(1 << nbits)
+      for idx in range(1 << nbits):
+        for pos, q in enumerate(bits):
+          want = (value >> (len(bits) - 1 - pos)) & 1
+          if (idx >> (nbits - 1 - q)) & 1 != want:
+            proj[idx] = 0
+      rho = psi.density()
+      expected = np.real(np.trace(np.diag(proj) @ rho))
+
+      p, collapsed = ops.Measure(psi, qubits, tostate)
+      self.assertAlmostEqual(p, expected, places=5)
+      ref = state.State(proj * psi / np.linalg.norm(proj * psi))
+      self.assertTrue(collapsed.is_close(ref))
+
+      p, same = ops.Measure(psi, qubits, tostate, collapse=False)
+      self.assertAlmostEqual(p, expected, places=5)
+      self.assertIs(same, psi)
+
 
 if __name__ == '__main__':
   absltest.main()
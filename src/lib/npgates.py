@@ -0,0 +1,201 @@
+# python3
+# pylint: disable=invalid-name
+
+"""Vectorized NumPy implementation of the libxgates kernels."""
+
+# If libxgates.so cannot be built or found, circuit.py re-directs
+# gate applications to this module. The functions here have the
+# same signatures as their C++ counterparts in xgates.cc, so that
+# they can be used interchangeably.
+#
+# Instead of iterating over amplitude pairs, we reshape the state
+# vector such that each qubit of interest gets its own axis of size 2.
+# For example, for a gate on qubit 1 of a 4-qubit state, we
+# reshape the 16 amplitudes as a (2, 2, 4) array:
+#
+#     psi[a, b, c]  with b being the value of qubit 1
+#
+# The two slices psi[:, 0, :] and psi[:, 1, :] then hold all the
+# amplitude pairs the gate mixes, which numpy updates in one pass.
+# For a controlled gate we first select the slice in which the
+# controller is |1> and only update that half of the state.
+#
+# All updates are done in place, via views into the state vector.
+
+from typing import List, Tuple
+
+import numpy as np
+
+
+def split(psi: np.ndarray, nbits: int, qubits: List[int]) -> np.ndarray:
+  """Reshape psi (as a view) to give each qubit in 'qubits' an axis."""
+
+  shape = []
+  prev = 0
+  for qubit in sorted(qubits):
+    shape += [1 << (qubit - prev), 2]
+    prev = qubit + 1
+  shape.append(1 << (nbits - prev))
+  return psi.reshape(shape)
+
+
+def axis(qubits: List[int], qubit: int) -> int:
+  """Return the axis of 'qubit' in a view produced by split()."""
+
+  return 2 * sorted(qubits).index(qubit) + 1
+
+
+def select(ndim: int, ax: int, val: int) -> Tuple:
+  """Index tuple selecting value 'val' along axis 'ax'."""
+
+  sel = [slice(None)] * ndim
+  sel[ax] = val
+  return tuple(sel)
+
+
+def apply_axis(view: np.ndarray, gate: np.ndarray, ax: int) -> None:
+  """Apply 2x2 gate in place along axis 'ax' of view."""
+
+  sel0 = select(view.ndim, ax, 0)
+  sel1 = select(view.ndim, ax, 1)
+  a = view[sel0].copy()
+  b = view[sel1]
+  view[sel0] *= gate[0, 0]
+  view[sel0] += gate[0, 1] * b
+  b *= gate[1, 1]
+  b += gate[1, 0] * a
+
+
+def apply1(psi: np.ndarray, gate: np.ndarray, nbits: int, qubit: int,
+           bitwidth: int = 0, nthreads: int = 1) -> None:
+  """Apply single-qubit gate to state psi."""
+
+  del bitwidth, nthreads  # Unused, the dtype of psi is authoritative.
+  gate = np.asarray(gate, dtype=psi.dtype).reshape((2, 2))
+  view = split(psi, nbits, [qubit])
+  apply_axis(view, gate, 1)
+
+
+def applyc(psi: np.ndarray, gate: np.ndarray, nbits: int, control: int,
+           target: int, bitwidth: int = 0, nthreads: int = 1) -> None:
+  """Apply controlled gate to state psi, only touch the control=|1> half."""
+
+  del bitwidth, nthreads  # Unused, the dtype of psi is authoritative.
+
+  # A controller outside of the state can never be |1>.
+  if not 0 <= control < nbits:
+    return
+  gate = np.asarray(gate, dtype=psi.dtype).reshape((2, 2))
+  qubits = [control, target]
+  view = split(psi, nbits, qubits)
+
+  # Selecting the controller=|1> slice removes its axis. If the
+  # controller was before the target, the target axis shifts down.
+  sub = view[select(view.ndim, axis(qubits, control), 1)]
+  ax = axis(qubits, target)
+  if control < target:
+    ax -= 1
+  apply_axis(sub, gate, ax)
+
+
+def apply2(psi: np.ndarray, gate: np.ndarray, nbits: int, q0: int, q1: int,
+           bitwidth: int = 0, nthreads: int = 1) -> None:
+  """Apply 4x4 gate on basis |q0 q1> (q0 is the higher bit) to psi."""
+
+  del bitwidth, nthreads  # Unused, the dtype of psi is authoritative.
+  gate = np.asarray(gate, dtype=psi.dtype).reshape((2, 2, 2, 2))
+  qubits = [q0, q1]
+  view = split(psi, nbits, qubits)
+  axes = [axis(qubits, q0), axis(qubits, q1)]
+  res = np.tensordot(gate, view, axes=([2, 3], axes))
+  view[...] = np.moveaxis(res, [0, 1], axes)
+
+
+def applymc(psi: np.ndarray, gate: np.ndarray, nbits: int, ctl_mask: int,
+            ctl_value_mask: int, target: int, bitwidth: int = 0,
+            nthreads: int = 1) -> None:
+  """Apply multi-controlled gate, controllers given as index bit masks."""
+
+  del bitwidth, nthreads  # Unused, the dtype of psi is authoritative.
+  gate = np.asarray(gate, dtype=psi.dtype).reshape((2, 2))
+  controls = [q for q in range(nbits) if ctl_mask & (1 << (nbits - 1 - q))]
+  qubits = controls + [target]
+  view = split(psi, nbits, qubits)
+
+  # Select the slice in which all controllers have their required
+  # value. This removes the controller axes, the target axis shifts
+  # down by one for each controller before it.
+  sel = [slice(None)] * view.ndim
+  for q in controls:
+    sel[axis(qubits, q)] = (ctl_value_mask >> (nbits - 1 - q)) & 1
+  ax = axis(qubits, target) - sum(1 for q in controls if q < target)
+  apply_axis(view[tuple(sel)], gate, ax)
+
+
+def scale_axis(view: np.ndarray, diag: np.ndarray, ax: int) -> None:
+  """Multiply the slices along axis 'ax' by the diagonal elements."""
+
+  for val in range(2):
+    if diag[val] != 1:
+      view[select(view.ndim, ax, val)] *= diag[val]
+
+
+def applyd(psi: np.ndarray, diag: np.ndarray, nbits: int, qubit: int,
+           bitwidth: int = 0, nthreads: int = 1) -> None:
+  """Apply diagonal single-qubit gate, given as its 2 diagonal elements."""
+
+  del bitwidth, nthreads  # Unused, the dtype of psi is authoritative.
+  diag = np.asarray(diag, dtype=psi.dtype).reshape(2)
+  view = split(psi, nbits, [qubit])
+  scale_axis(view, diag, 1)
+
+
+def applymcd(psi: np.ndarray, diag: np.ndarray, nbits: int, ctl_mask: int,
+             ctl_value_mask: int, target: int, bitwidth: int = 0,
+             nthreads: int = 1) -> None:
+  """Apply diagonal multi-controlled gate, controllers as index bit masks."""
+
+  del bitwidth, nthreads  # Unused, the dtype of psi is authoritative.
+  diag = np.asarray(diag, dtype=psi.dtype).reshape(2)
+  controls = [q for q in range(nbits) if ctl_mask & (1 << (nbits - 1 - q))]
+  qubits = controls + [target]
+  view = split(psi, nbits, qubits)
+
+  # Same slicing as in applymc().
+  sel = [slice(None)] * view.ndim
+  for q in controls:
+    sel[axis(qubits, q)] = (ctl_value_mask >> (nbits - 1 - q)) & 1
+  ax = axis(qubits, target) - sum(1 for q in controls if q < target)
+  scale_axis(view[tuple(sel)], diag, ax)
+
+
+# Hadamard layers are applied a few qubits at a time, as one matrix
+# multiplication with H^(x)k per group of up to _HADAMARD_GROUP
+# adjacent qubits, instead of one pass per qubit.
+_HADAMARD_GROUP = 6
+
+
+def hadamard(k: int) -> np.ndarray:
+  """Return the normalized 2^k x 2^k Walsh-Hadamard matrix."""
+
+  h = np.ones((1, 1))
+  for _ in range(k):
+    h = np.kron(h, [[1.0, 1.0], [1.0, -1.0]])
+  return h / np.sqrt(1 << k)
+
+
+def applyh(psi: np.ndarray, nbits: int, qubit_mask: int,
+           bitwidth: int = 0, nthreads: int = 1) -> None:
+  """Apply a Hadamard gate to each qubit in the index bit mask."""
+
+  del bitwidth, nthreads  # Unused, the dtype of psi is authoritative.
+  qubits = [q for q in range(nbits) if qubit_mask & (1 << (nbits - 1 - q))]
+  while qubits:
+    # Group of adjacent qubits, starting with the first one.
+    k = 1
+    while (k < len(qubits) and k < _HADAMARD_GROUP and
+           qubits[k] == qubits[0] + k):
+      k += 1
+    view = psi.reshape(1 << qubits[0], 1 << k, -1)
+    view[...] = np.matmul(hadamard(k).astype(psi.dtype), view)
+    qubits = qubits[k:]
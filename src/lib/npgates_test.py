@@ -0,0 +1,136 @@
+# python3
+import random
+
+from absl.testing import absltest
+import numpy as np
+
+from src.lib import helper
+from src.lib import npgates
+from src.lib import ops
+from src.lib import state
+
+
+class NpGatesTest(absltest.TestCase):
+
+  def test_apply1(self):
+    nbits = 6
+    for gate in [ops.Hadamard(), ops.PauliY(), ops.Vgate(),
+                 ops.RotationX(0.3), ops.U1(1.1)]:
+      for idx in range(nbits):
+        psi = state.rand_state(nbits)
+        ref = psi.copy()
+        npgates.apply1(psi, gate.reshape(4), nbits, idx)
+        ref.apply1(gate, idx)
+        self.assertTrue(psi.is_close(ref))
+
+  def test_applyc(self):
+    nbits = 5
+    for gate in [ops.PauliX(), ops.Yroot(), ops.U1(0.7)]:
+      for ctl in range(nbits):
+        for tgt in range(nbits):
+          if ctl == tgt:
+            continue
+          psi = state.rand_state(nbits)
+          ref = psi.copy()
+          npgates.applyc(psi, gate.reshape(4), nbits, ctl, tgt)
+          ref.applyc(gate, ctl, tgt)
+          self.assertTrue(psi.is_close(ref))
+
+  def test_applyc_classical(self):
+    nbits = 8
+    for _ in range(10):
+      bits = [random.randint(0, 1) for _ in range(nbits)]
+      ctl, tgt = random.sample(range(nbits), 2)
+      psi = state.bitstring(*bits)
+      npgates.applyc(psi, ops.PauliX().reshape(4), nbits, ctl, tgt)
+      if bits[ctl]:
+        bits[tgt] = 1 - bits[tgt]
+      self.assertTrue(psi.is_close(state.bitstring(*bits)))
+
+  def test_apply2(self):
+    nbits = 4
+    gate = ops.Operator(np.kron(ops.Yroot(), ops.Tgate()) @
+                        ops.Cnot(0, 1) @
+                        np.kron(ops.RotationY(0.3), ops.Vgate()))
+    for q0 in range(nbits):
+      for q1 in range(nbits):
+        if q0 == q1:
+          continue
+        psi = state.rand_state(nbits)
+        ref = state.State(np.zeros(1 << nbits))
+        for idx in range(1 << nbits):
+          bits = helper.val2bits(idx, nbits)
+          row = 2 * bits[q0] + bits[q1]
+          for col in range(4):
+            bits[q0], bits[q1] = col >> 1, col & 1
+            ref[idx] += gate[row, col] * psi[helper.bits2val(bits)]
+        npgates.apply2(psi, gate.reshape(16), nbits, q0, q1)
+        self.assertTrue(psi.is_close(ref))
+
+  def test_applymc(self):
+    nbits = 5
+    gate = ops.RotationX(0.6)
+    for _ in range(20):
+      qubits = random.sample(range(nbits), random.randint(1, nbits))
+      tgt, ctl = qubits[0], qubits[1:]
+      by_1 = [random.randint(0, 1) for _ in ctl]
+      ctl_mask = sum(1 << (nbits - 1 - c) for c in ctl)
+      ctl_value_mask = sum(v << (nbits - 1 - c) for c, v in zip(ctl, by_1))
+
+      psi = state.rand_state(nbits)
+      ref = psi.copy()
+      npgates.applymc(psi, gate.reshape(4), nbits, ctl_mask, ctl_value_mask,
+                      tgt)
+      for idx in range(1 << nbits):
+        bits = helper.val2bits(idx, nbits)
+        if bits[tgt] or any(bits[c] != v for c, v in zip(ctl, by_1)):
+          continue
+        partner = idx + (1 << (nbits - 1 - tgt))
+        a, b = ref[idx], ref[partner]
+        ref[idx] = gate[0, 0] * a + gate[0, 1] * b
+        ref[partner] = gate[1, 0] * a + gate[1, 1] * b
+      self.assertTrue(psi.is_close(ref))
+
+  def test_applyd(self):
+    nbits = 5
+    for gate in [ops.PauliZ(), ops.Tgate(), ops.U1(0.4), ops.RotationZ(0.9)]:
+      for idx in range(nbits):
+        psi = state.rand_state(nbits)
+        ref = psi.copy()
+        npgates.applyd(psi, np.diagonal(gate).copy(), nbits, idx)
+        ref.apply1(gate, idx)
+        self.assertTrue(psi.is_close(ref))
+
+  def test_applymcd(self):
+    nbits = 5
+    gate = ops.RotationZ(0.6)
+    for _ in range(20):
+      qubits = random.sample(range(nbits), random.randint(1, nbits))
+      tgt, ctl = qubits[0], qubits[1:]
+      by_1 = [random.randint(0, 1) for _ in ctl]
+      ctl_mask = sum(1 << (nbits - 1 - c) for c in ctl)
+      ctl_value_mask = sum(v << (nbits - 1 - c) for c, v in zip(ctl, by_1))
+
+      psi = state.rand_state(nbits)
+      ref = psi.copy()
+      npgates.applymcd(psi, np.diagonal(gate).copy(), nbits, ctl_mask,
+                       ctl_value_mask, tgt)
+      npgates.applymc(ref, gate.reshape(4), nbits, ctl_mask, ctl_value_mask,
+                      tgt)
+      self.assertTrue(psi.is_close(ref))
+
+  def test_applyh(self):
+    nbits = 9
+    for _ in range(10):
+      qubits = random.sample(range(nbits), random.randint(1, nbits))
+      psi = state.rand_state(nbits)
+      ref = psi.copy()
+      mask = sum(1 << (nbits - 1 - q) for q in qubits)
+      npgates.applyh(psi, nbits, mask)
+      for q in qubits:
+        ref.apply1(ops.Hadamard(), q)
+      self.assertTrue(psi.is_close(ref))
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -38,15 +38,19 @@ class Operator(tensor.Tensor):
   #
   # On State:
   # ------------
-  # If idx != 0 the operator is expanded to the size of the state the
-  # following way:
+  # Conceptually, if idx != 0 the operator is expanded to the size of
+  # the state the following way:
   #    First create Identity ops up to idx
   #    Then tensor in the n-bits operator itself
   #    The finish up by tensoring Identities until the size of the
   #    operator matches the size of the state.
   #
-  # Once the operator has been constructed a simple matmul does the
-  # application and produces a new state.
+  # A matmul with this expanded operator would then produce the new
+  # state. However, the expanded operator needs O(4^n) memory, even
+  # for a single-qubit gate. Instead, we view the state as a tensor
+  # of shape (2^idx, 2^k, rest), with the k-qubit operator acting on
+  # the middle dimension only, and apply the operator with a (batched)
+  # matmul over that dimension, in O(2^n * 2^k).
   #
   # On Operator:
   # -------------
@@ -61,6 +65,17 @@ class Operator(tensor.Tensor):
   ) -> Union[state.State, Operator]:
     """Apply operator to a state or operator."""
 
+    if isinstance(arg, DiagonalOperator):
+      # arg @ self only scales the rows of self.
+      assert self.nbits >= idx + arg.nbits, 'Mismatched dimensions.'
+      diag = arg.expand(idx, self.nbits).diag
+      return self.__class__(np.multiply(diag[:, np.newaxis], self))
+
+    if isinstance(arg, PermutationOperator):
+      # arg @ self only selects the rows of self.
+      assert self.nbits >= idx + arg.nbits, 'Mismatched dimensions.'
+      return self.__class__(self[arg.expand(idx, self.nbits).perm])
+
     if isinstance(arg, Operator):
       arg_bits = arg.nbits
       if idx > 0:
@@ -90,13 +105,9 @@ class Operator(tensor.Tensor):
       return arg @ self
 
     assert isinstance(arg, state.State), 'Error, expected State.'
-    op = self
-    if idx > 0:
-      op = Identity().kpow(idx) * op
-    if arg.nbits - idx - self.nbits > 0:
-      op = op * Identity().kpow(arg.nbits - idx - self.nbits)
-
-    return state.State(np.matmul(op, arg))
+    assert arg.nbits >= idx + self.nbits, 'Mismatched dimensions.'
+    view = np.asarray(arg).reshape(1 << idx, self.shape[0], -1)
+    return state.State(np.matmul(np.asarray(self), view).reshape(-1))
 
   def __call__(
       self, arg: Union[state.State, Operator], idx=0
@@ -104,6 +115,172 @@ class Operator(tensor.Tensor):
     return self.apply(arg, idx)
 
 
+# Permutation matrices, such as the Oracles below, have a single 1 in
+# each row and column. Storing them densely costs O(4^n) memory and
+# applying them O(4^n) time. Instead, we only store the column index
+# of the 1 in each row:
+#
+#     U[row, perm[row]] = 1
+#
+# Applying U to a state is then just a gather, psi[perm], in O(2^n).
+# Composing two permutations is a gather over the index arrays, and
+# composing with a dense Operator only reorders its rows or columns.
+#
+class PermutationOperator:
+  """Permutation matrix, stored as the column index of each row's 1."""
+
+  def __init__(self, perm, name=None):
+    perm = np.asarray(perm, dtype=np.int64)
+    dim = perm.size
+    if perm.ndim != 1 or dim == 0 or dim & (dim - 1):
+      raise ValueError('Permutation size must be a power of 2.')
+    if (perm.min() < 0 or perm.max() >= dim or
+        (np.bincount(perm, minlength=dim) != 1).any()):
+      raise ValueError('Index map is not a permutation.')
+    self.perm = perm
+    self.name = name
+
+  @property
+  def nbits(self) -> int:
+    return self.perm.size.bit_length() - 1
+
+  @property
+  def shape(self) -> Tuple[int, int]:
+    return (self.perm.size, self.perm.size)
+
+  def adjoint(self) -> PermutationOperator:
+    inverse = np.empty_like(self.perm)
+    inverse[self.perm] = np.arange(self.perm.size)
+    return PermutationOperator(inverse, self.name)
+
+  def expand(self, idx: int, nbits: int) -> PermutationOperator:
+    """Return this permutation on qubits idx.. of an nbits system."""
+
+    if idx == 0 and nbits == self.nbits:
+      return self
+    assert nbits >= idx + self.nbits, 'Mismatched dimensions.'
+    index = np.arange(1 << nbits).reshape(1 << idx, self.perm.size, -1)
+    return PermutationOperator(index[:, self.perm, :].ravel(), self.name)
+
+  def dense(self) -> Operator:
+    """Return the full matrix."""
+
+    u = np.zeros(self.shape)
+    u[np.arange(self.perm.size), self.perm] = 1.0
+    return Operator(u, self.name)
+
+  def __array__(self, dtype=None, copy=None):
+    return np.asarray(self.dense(), dtype=dtype)
+
+  # Same semantics as Operator.apply(), x(y) == y @ x.
+  def apply(
+      self, arg: Union[state.State, Operator, PermutationOperator], idx: int
+  ) -> Union[state.State, Operator, PermutationOperator]:
+    """Apply permutation to a state or operator."""
+
+    if isinstance(arg, PermutationOperator):
+      arg = arg.expand(idx, max(self.nbits, idx + arg.nbits))
+      assert self.nbits == arg.nbits, 'Mismatched dimensions.'
+      return PermutationOperator(self.perm[arg.perm])
+
+    if isinstance(arg, Operator):
+      arg_bits = arg.nbits
+      if idx > 0:
+        arg = Identity().kpow(idx) * arg
+      if self.nbits > arg.nbits:
+        arg = arg * Identity().kpow(self.nbits - idx - arg_bits)
+      assert self.nbits == arg.nbits, 'Mismatched dimensions.'
+      # arg @ self only reorders the columns of arg.
+      return arg.__class__(arg[:, self.adjoint().perm])
+
+    assert isinstance(arg, state.State), 'Error, expected State.'
+    assert arg.nbits >= idx + self.nbits, 'Mismatched dimensions.'
+    psi = arg.reshape(1 << idx, self.perm.size, -1)
+    return state.State(psi[:, self.perm, :].ravel())
+
+  def __call__(
+      self, arg: Union[state.State, Operator, PermutationOperator], idx=0
+  ) -> Union[state.State, Operator, PermutationOperator]:
+    return self.apply(arg, idx)
+
+
+# Diagonal matrices, such as the phase Oracles below, only scale each
+# amplitude. Similar to permutations, we only store the diagonal and
+# apply it with an elementwise multiply in O(2^n).
+#
+class DiagonalOperator:
+  """Diagonal matrix, stored as the vector of its diagonal elements."""
+
+  def __init__(self, diag, name=None):
+    diag = np.asarray(diag, dtype=tensor.tensor_type())
+    dim = diag.size
+    if diag.ndim != 1 or dim == 0 or dim & (dim - 1):
+      raise ValueError('Diagonal size must be a power of 2.')
+    self.diag = diag
+    self.name = name
+
+  @property
+  def nbits(self) -> int:
+    return self.diag.size.bit_length() - 1
+
+  @property
+  def shape(self) -> Tuple[int, int]:
+    return (self.diag.size, self.diag.size)
+
+  def adjoint(self) -> DiagonalOperator:
+    return DiagonalOperator(np.conj(self.diag), self.name)
+
+  def expand(self, idx: int, nbits: int) -> DiagonalOperator:
+    """Return this operator on qubits idx.. of an nbits system."""
+
+    if idx == 0 and nbits == self.nbits:
+      return self
+    assert nbits >= idx + self.nbits, 'Mismatched dimensions.'
+    diag = np.broadcast_to(self.diag[np.newaxis, :, np.newaxis],
+                           (1 << idx, self.diag.size,
+                            1 << (nbits - idx - self.nbits)))
+    return DiagonalOperator(diag.ravel(), self.name)
+
+  def dense(self) -> Operator:
+    """Return the full matrix."""
+
+    return Operator(np.diag(self.diag), self.name)
+
+  def __array__(self, dtype=None, copy=None):
+    return np.asarray(self.dense(), dtype=dtype)
+
+  # Same semantics as Operator.apply(), x(y) == y @ x.
+  def apply(
+      self, arg: Union[state.State, Operator, DiagonalOperator], idx: int
+  ) -> Union[state.State, Operator, DiagonalOperator]:
+    """Apply diagonal operator to a state or operator."""
+
+    if isinstance(arg, DiagonalOperator):
+      arg = arg.expand(idx, max(self.nbits, idx + arg.nbits))
+      assert self.nbits == arg.nbits, 'Mismatched dimensions.'
+      return DiagonalOperator(arg.diag * self.diag)
+
+    if isinstance(arg, Operator):
+      arg_bits = arg.nbits
+      if idx > 0:
+        arg = Identity().kpow(idx) * arg
+      if self.nbits > arg.nbits:
+        arg = arg * Identity().kpow(self.nbits - idx - arg_bits)
+      assert self.nbits == arg.nbits, 'Mismatched dimensions.'
+      # arg @ self only scales the columns of arg.
+      return arg.__class__(np.multiply(arg, self.diag))
+
+    assert isinstance(arg, state.State), 'Error, expected State.'
+    assert arg.nbits >= idx + self.nbits, 'Mismatched dimensions.'
+    psi = arg.reshape(1 << idx, self.diag.size, -1)
+    return state.State(np.multiply(psi, self.diag[:, np.newaxis]).ravel())
+
+  def __call__(
+      self, arg: Union[state.State, Operator, DiagonalOperator], idx=0
+  ) -> Union[state.State, Operator, DiagonalOperator]:
+    return self.apply(arg, idx)
+
+
 # --------------------------------------------------------------
 # Single Qubit Gates / Generators.
 # --------------------------------------------------------------
@@ -297,29 +474,43 @@ def Toffoli(idx0: int, idx1: int, idx2: int) -> Operator:
   return toffoli
 
 
-def OracleUf(nbits: int, f: Callable[[List[int]], int]) -> Operator:
+def OracleUf(nbits: int,
+             f: Callable[[List[int]], int]) -> PermutationOperator:
   """Make an n-qubit Oracle for function f (e.g. Deutsch, Grover)."""
 
   # This Oracle is constructed similar to the implementation in
-  # ./deutsch.py, just with an n-bit |x> and a 1-bit |y>
+  # ./deutsch.py, just with an n-bit |x> and a 1-bit |y>. It maps
+  # row |x, y> to column |x, y ^ f(x)>, a permutation, so we only
+  # have to evaluate f once for each x. The bits of x are extracted
+  # in vectorized chunks, which is much faster than val2bits().
   #
-  dim = 2**nbits
-  u = np.zeros(dim**2).reshape(dim, dim)
-  for row in range(dim):
-    bits = helper.val2bits(row, nbits)
-    fx = f(bits[0:-1])  # f(x) without the y.
-    xor = bits[-1] ^ fx
-
-    new_bits = bits[0:-1]
-    new_bits.append(int(xor))
-
-    # Construct new column (int) from the new bit sequence.
-    new_col = helper.bits2val(new_bits)
-    u[row][new_col] = 1.0
-
-  op = Operator(u)
-  assert op.is_unitary(), 'Constructed non-unitary operator.'
-  return op
+  shifts = np.arange(nbits - 2, -1, -1)
+  fx = []
+  for start in range(0, 1 << (nbits - 1), 1 << 14):
+    x = np.arange(start, min(start + (1 << 14), 1 << (nbits - 1)))
+    fx.extend(f(bits) for bits in ((x[:, None] >> shifts) & 1).tolist())
+  fx = np.array(fx, dtype=np.int64)
+  return PermutationOperator(np.arange(1 << nbits) ^ np.repeat(fx, 2),
+                             'Uf')
+
+
+def PhaseOracle(nbits: int,
+                predicate: Callable[[np.ndarray], np.ndarray]
+               ) -> DiagonalOperator:
+  """Make an n-qubit Oracle that flips the sign of marked states."""
+
+  # Instead of the xor into an ancilla |y> of OracleUf, which turns
+  # into a phase of -1 for |y> = |->, this Oracle applies the phase
+  # directly, without ancilla. The predicate is called only once,
+  # with the array of all 2^n state indices, and must return a
+  # boolean mask marking the solutions. Bit i of index x, with bit
+  # 0 the highest-order bit, is (x >> (nbits - 1 - i)) & 1.
+  #
+  x = np.arange(1 << nbits)
+  mask = np.asarray(predicate(x), dtype=bool)
+  if mask.shape != x.shape:
+    raise ValueError('Predicate must return a mask over all indices.')
+  return DiagonalOperator(np.where(mask, -1.0, 1.0), 'Of')
 
 
 # Build the QFT operator. A good explanation can be found here:
@@ -334,40 +525,122 @@ def OracleUf(nbits: int, f: Callable[[List[int]], int]) -> Operator:
 # collapse to a random state. So this operator is usually only
 # a first step.
 #
+# The sequence of Hadamard and controlled Rk gates above computes the
+# discrete Fourier transform with omega = exp(2 pi i / 2^n). Without
+# the final swaps, the result comes out in bit-reversed order. We
+# construct that matrix directly, instead of multiplying O(n^2) gates.
+#
+def _qft_matrix(nbits: int, swap: bool, dtype) -> np.ndarray:
+  """Make the DFT matrix omega^(jk) / sqrt(2^nbits)."""
+
+  dim = 2**nbits
+  idx = np.arange(dim)
+  jk = np.outer(idx, idx) % dim
+
+  # Normalize the way nbits Hadamard gates do, by multiplying with
+  # 1/sqrt(2) nbits times, in the target precision.
+  scale = dtype(1.0)
+  for _ in range(nbits):
+    scale = scale * dtype(1 / math.sqrt(2))
+  mat = np.exp(2j * math.pi * jk / dim).astype(dtype) * scale
+  if not swap:
+    mat = mat[helper.bit_reversal(nbits), :]
+  return mat
+
+
 def Qft(nbits: int, swap: bool = True) -> Operator:
   """Make an n-bit QFT operator."""
 
-  op = Identity(nbits)
-  h = Hadamard()
+  return Operator(_qft_matrix(nbits, swap, tensor.tensor_type()))
 
-  for idx in range(nbits):
-    # Each qubit first gets a Hadamard
-    op = op(h, idx)
 
-    # Each qubit now gets a sequence of Rk(2), Rk(3), ..., Rk(nbits)
-    # controlled by qubit (1, 2, ..., nbits-1).
-    for rk in range(2, nbits - idx + 1):
-      controlled_from = idx + rk - 1
-      op = op(ControlledU(controlled_from, idx, Rk(rk)), idx)
+def apply_qft(psi: state.State, idx: int, nbits: int,
+              inverse: bool = False) -> state.State:
+  """Apply Qft(nbits) (or its adjoint) to psi at idx, via FFT."""
 
-  # Now the qubits may need to change their order.
-  if swap:
-    for idx in range(nbits // 2):
-      op = op(Swap(idx, nbits - idx - 1), idx)
+  # Same as Qft(nbits)(psi, idx), without ever building the matrix.
+  # The DFT with positive sign in the exponent is numpy's ifft.
+  view = np.asarray(psi).reshape(2**idx, 2**nbits, -1)
+  fft = np.fft.fft if inverse else np.fft.ifft
+  res = fft(view, axis=1, norm='ortho')
+  return state.State(res.reshape(-1))
 
-  assert op.is_unitary(), 'Constructed non-unitary operator.'
-  return op
 
+# Phase estimation applies the powers U^(2^k) of U, each controlled
+# by one qubit of the phase register. Squaring U over and over, and
+# Kronecker-expanding each power to a full-size controlled operator,
+# costs O(8^n) per power. Instead, we diagonalize U once:
+#
+#     U = V diag(lambda) V^dagger
+#
+# The powers are then just lambda^(2^k), cached in UnitaryPowers. We
+# move the target register to U's eigenbasis with V^dagger, multiply
+# the amplitudes where a control qubit is |1> with the eigenvalue
+# powers, and move back with V.
+#
+# To find V, note that for a unitary (normal) U, the Hermitian and
+# anti-Hermitian parts of U commute. A generic mix of the two is a
+# Hermitian matrix with U's eigenvectors, which eigh() computes as an
+# orthonormal basis, even for degenerate eigenvalues. Should this fail
+# to reconstruct U, we fall back to caching the squared matrices.
+#
+class UnitaryPowers:
+  """Cache of the powers U^(2^k) of a unitary U."""
+
+  def __init__(self, u: Operator):
+    u = np.asarray(u, dtype=np.complex128)
+    herm = (u + u.conj().T) / 2 + math.pi / math.e * (u - u.conj().T) / 2j
+    _, vecs = np.linalg.eigh(herm)
+    vals = np.einsum('ji,jk,ki->i', vecs.conj(), u, vecs)
+    vals /= np.abs(vals)
+    if np.allclose((vecs * vals) @ vecs.conj().T, u, atol=1e-5):
+      self.vecs = vecs
+      self.powers = [vals]
+    else:
+      self.vecs = None
+      self.powers = [u]
+    self.nbits = u.shape[0].bit_length() - 1
+
+  def is_diagonal(self) -> bool:
+    return self.vecs is not None
+
+  def power(self, k: int) -> np.ndarray:
+    """Return U^(2^k), as eigenvalues if diagonal, else as matrix."""
 
-def PhaseEstimation(op: Operator, psi: state.State,
+    while len(self.powers) <= k:
+      u = self.powers[-1]
+      self.powers.append(u * u if self.is_diagonal() else u @ u)
+    return self.powers[k]
+
+
+def PhaseEstimation(op: Union[Operator, UnitaryPowers], psi: state.State,
                     nbits_phase: int, target: int, offset: int = 0):
   """Apply phase estimation."""
 
-  cu = op
-  for inv in reversed(range(nbits_phase)):
-    psi = ControlledU(inv + offset, target, cu)(psi, inv + offset)
-    cu = cu(cu)
-  return psi
+  # Qubit offset + i controls U^(2^(nbits_phase - 1 - i)).
+  powers = op if isinstance(op, UnitaryPowers) else UnitaryPowers(op)
+  dim = 1 << powers.nbits
+  assert offset + nbits_phase <= target, 'Phase register must come first.'
+  assert psi.nbits >= target + powers.nbits, 'Mismatched dimensions.'
+
+  def transform(psi: np.ndarray, mat: np.ndarray) -> np.ndarray:
+    view = psi.reshape(1 << target, dim, -1)
+    return np.matmul(mat.astype(psi.dtype), view).reshape(-1)
+
+  res = np.array(psi)
+  if powers.is_diagonal():
+    res = transform(res, powers.vecs.conj().T)
+  for idx in range(nbits_phase):
+    ctl = offset + idx
+    view = res.reshape(1 << ctl, 2, 1 << (target - ctl - 1), dim, -1)
+    power = powers.power(nbits_phase - 1 - idx).astype(res.dtype)
+    if powers.is_diagonal():
+      view[:, 1] *= power[:, np.newaxis]
+    else:
+      view[:, 1] = np.matmul(power, view[:, 1])
+  if powers.is_diagonal():
+    res = transform(res, powers.vecs)
+  return state.State(res)
 
 
 # Trace out a qubit from a density matrix and return the
@@ -376,85 +649,75 @@ def PhaseEstimation(op: Operator, psi: state.State,
 def TraceOutSingle(rho: Operator, index: int) -> Operator:
   """Trace out single qubit from density matrix."""
 
-  nbits = int(math.log2(rho.shape[0]))
-  assert 0 <= index < nbits, 'TraceOutSingle: Invalid index.'
-
-  eye = Identity()
-  zero = Operator([1.0, 0.0])
-  one = Operator([0.0, 1.0])
-
-  p0 = p1 = tensor.Tensor(1.0)
-  for idx in range(nbits):
-    if idx == index:
-      p0 = p0 * zero
-      p1 = p1 * one
-    else:
-      p0 = p0 * eye
-      p1 = p1 * eye
-
-  rho0 = p0 @ rho @ p0.transpose()
-  rho1 = p1 @ rho @ p1.transpose()
-  return rho0 + rho1
+  return TraceOut(rho, [index])
 
 
+# Tracing out qubits does not need projectors. With rho viewed as a
+# tensor with one row and one column axis per qubit, the partial trace
+# sums over the diagonal of the row and column axes of each traced
+# qubit. A single einsum does this for all of them at once, the
+# remaining qubits keep their order. For example, tracing out qubits
+# 0 and 2 from a 3-qubit rho is:
+#
+#    rho.reshape(2, 2, 2, 2, 2, 2) -> einsum('abcadc->bd')
+#
 def TraceOut(rho: Operator, index_set: List[int]) -> Operator:
   """Trace out multiple qubits from density matrix."""
 
-  for idx, val in enumerate(index_set):
-    nbits = int(math.log2(rho.shape[0]))
-    rho = TraceOutSingle(rho, val)
-
-    # Tracing out a bit means that rho is now 1 bit smaller, the
-    # indices right to the traced out qubit need to shift left by 1.
-    # Example, to trace out bits 2, 4:
-    # Before:
-    #    qubit 0  1  2  3  4  5
-    #          a  b  c  d  e  f
-    # Trace out 2:
-    #    qubit 0  1 <-  3  4  5
-    #    qubit 0  1  2  3  4
-    #          a  b  d  e  f
-    # Trace out 4 (is now 3)
-    #    qubit 0  1  2  <-  4
-    #    qubit 0  1  2  3
-    #          a  b  d  f
-    for i in range(idx + 1, len(index_set)):
-      index_set[i] = index_set[i] - 1
-  return rho
+  nbits = int(math.log2(rho.shape[0]))
+  index_set = set(index_set)
+  assert all(0 <= idx < nbits for idx in index_set), (
+      'TraceOut: Invalid index.')
+
+  rows = list(range(nbits))
+  cols = [idx if idx in index_set else nbits + idx for idx in range(nbits)]
+  keep = [idx for idx in range(nbits) if idx not in index_set]
+  res = np.einsum(np.asarray(rho).reshape([2] * 2 * nbits), rows + cols,
+                  keep + [nbits + idx for idx in keep])
+  dim = 1 << len(keep)
+  return Operator(res.reshape(dim, dim))
 
 
 def Measure(
-    psi: state.State, idx: int, tostate: int = 0, collapse: bool = True
+    psi: state.State, idx, tostate=0, collapse: bool = True
 ) -> Tuple[float, state.State]:
-  """Measure a qubit via a projector on the density matrix."""
+  """Measure a qubit (or several) in a state, can collapse the state."""
 
   # Measure() measure qubit 'idx' in state 'psi'. It both measures the
   # probability of the result being state `tostate` and, if `collapse`
   # is set to true, also collapses the state to `tostate`. It is helpful
   # for debugging to have this forcing function, but care must
   # be taken not to collapse the state to one with 0 probability.
-
-  # Compute probability of qubit(idx) to be in state 0 / 1.
-  rho = psi.density()
-  op = ZeroProjector(1) if tostate == 0 else OneProjector(1)
-
-  # Construct full matrix to apply to density matrix:
-  if idx > 0:
-    op = Identity().kpow(idx) * op
-  if idx < psi.nbits - 1:
-    op = op * Identity().kpow(psi.nbits - idx - 1)
-
-  # Probability is the trace.
-  prob = np.trace(np.matmul(op, rho))
+  #
+  # idx may also be a list of qubits, tostate then is the value of
+  # these qubits (idx[0] being the highest-order bit) or their bits.
+  #
+  # Applying the projector P = |tostate><tostate| to the density
+  # matrix, as in Tr(P rho), is not necessary. With psi viewed as a
+  # tensor with one axis per qubit, fixing the measured axes selects
+  # the amplitudes that P keeps, as a strided view. The probability
+  # is the sum of their squared magnitudes and collapsing keeps just
+  # them, all in O(2^n).
+  qubits = [idx] if isinstance(idx, int) else list(idx)
+  if isinstance(tostate, (int, np.integer)):
+    tostate = helper.val2bits(int(tostate), len(qubits))
+  assert len(tostate) == len(qubits), 'Invalid state to measure.'
+
+  nbits = psi.nbits
+  index = [slice(None)] * nbits
+  for qubit, bit in zip(qubits, tostate):
+    assert 0 <= qubit < nbits, 'Invalid qubit index'
+    index[qubit] = bit
+  index = tuple(index)
+  view = np.asarray(psi).reshape([2] * nbits)
+  prob = float(np.sum(np.square(np.abs(view[index])), dtype=np.float64))
 
   # Collapse state and normalize
   if collapse:
-    mvmul = np.dot(op, psi)
-    divisor = np.real(np.linalg.norm(mvmul))
-
-    assert divisor > 1e-10, 'Measurement collapses to 0.0.'
-    normed = mvmul / divisor
-    return np.real(prob), state.State(normed)
+    assert prob > 1e-20, 'Measurement collapses to 0.0.'
+    normed = np.zeros_like(view)
+    normed[index] = view[index] / math.sqrt(prob)
+    return prob, state.State(normed.reshape(-1))
 
   # Return original state to enable chaining.
-  return np.real(prob), psi
+  return prob, psi
@@ -210,6 +210,108 @@ class OpsTest(absltest.TestCase):
       if val != psi[idx]:
         raise AssertionError('Incorrect QFT vs Hadamards.')
 
+  def test_qft_cache(self):
+    op = ops.Qft(4)
+    op[0, 0] = 0.0
+    self.assertTrue(ops.Qft(4).is_unitary())
+    self.assertTrue(ops.Qft(4, False).is_close(
+        ops.Qft(4)(ops.Swap(0, 3)(ops.Swap(1, 2), 1))))
+
+  def test_apply_qft(self):
+    psi = state.rand_state(6)
+    for idx, nbits in [(0, 6), (0, 3), (2, 3), (1, 5)]:
+      self.assertTrue(ops.apply_qft(psi, idx, nbits).is_close(
+          ops.Qft(nbits)(psi, idx)))
+      self.assertTrue(ops.apply_qft(psi, idx, nbits, inverse=True).is_close(
+          ops.Qft(nbits).adjoint()(psi, idx)))
+
+  def test_oracle_uf(self):
+    nbits = 5
+    answers = np.random.randint(0, 2, 1 << (nbits - 1))
+    uf = ops.OracleUf(nbits, lambda bits: answers[helper.bits2val(bits)])
+    u = uf.dense()
+    for row in range(1 << nbits):
+      x, y = row >> 1, row & 1
+      self.assertEqual(u[row, 2 * x + (y ^ answers[x])], 1.0)
+    self.assertTrue(u.is_permutation())
+
+    psi = state.rand_state(nbits)
+    self.assertTrue(uf(psi).is_close(u(psi)))
+    self.assertTrue(ops.Operator(uf).is_close(u))
+
+    # Padding and composition.
+    big = state.State(np.random.randn(1 << 8) + 0j).normalize()
+    self.assertTrue(uf(big, 2).is_close(u(big, 2)))
+    h = ops.Hadamard(nbits)
+    self.assertTrue(h(uf).is_close(h(u)))
+    self.assertTrue(uf(h).is_close(u(h)))
+    self.assertTrue(uf(ops.Hadamard(2), 1).is_close(u(ops.Hadamard(2), 1)))
+    self.assertTrue(uf(uf).dense().is_close(ops.Identity(nbits)))
+    self.assertTrue(uf.adjoint().dense().is_close(u.adjoint()))
+    cx = ops.PermutationOperator([0, 1, 3, 2])
+    self.assertTrue(uf(cx, 3).dense().is_close(u(ops.Cnot(0, 1), 3)))
+
+    with self.assertRaises(ValueError):
+      ops.PermutationOperator([0, 1, 1, 2])
+    with self.assertRaises(ValueError):
+      ops.PermutationOperator([0, 2, 1])
+
+  def test_phase_oracle(self):
+    nbits = 5
+    answers = np.random.randint(0, 2, 1 << nbits)
+    of = ops.PhaseOracle(nbits, lambda x: answers[x] == 1)
+    o = of.dense()
+    self.assertTrue(o.is_close(np.diag(1.0 - 2.0 * answers)))
+
+    # Same as OracleUf with an ancilla in |->.
+    uf = ops.OracleUf(nbits + 1, lambda bits: answers[helper.bits2val(bits)])
+    psi = state.rand_state(nbits)
+    minus = ops.Hadamard()(state.ones(1))
+    self.assertTrue(uf(psi * minus).is_close(of(psi) * minus))
+
+    # Padding and composition.
+    big = state.State(np.random.randn(1 << 8) + 0j).normalize()
+    self.assertTrue(of(big, 2).is_close(o(big, 2)))
+    h = ops.Hadamard(nbits)
+    self.assertTrue(h(of).is_close(h(o)))
+    self.assertTrue(of(h).is_close(o(h)))
+    self.assertTrue(of(ops.Hadamard(2), 1).is_close(o(ops.Hadamard(2), 1)))
+    self.assertTrue(ops.Hadamard(6)(of, 1).is_close(ops.Hadamard(6)(o, 1)))
+    self.assertTrue(of(of).dense().is_close(ops.Identity(nbits)))
+    z = ops.DiagonalOperator([1.0, -1.0])
+    self.assertTrue(of(z, 3).dense().is_close(o(ops.PauliZ(), 3)))
+
+    with self.assertRaises(ValueError):
+      ops.PhaseOracle(nbits, lambda x: True)
+
+  def test_phase_estimation(self):
+    def reference(u, psi, nbits_phase, target, offset):
+      for inv in reversed(range(nbits_phase)):
+        psi = ops.ControlledU(inv + offset, target, u)(psi, inv + offset)
+        u = u(u)
+      return psi
+
+    q, _ = np.linalg.qr(np.random.randn(4, 4) + 1j * np.random.randn(4, 4))
+    for u in [ops.Operator(q), ops.Cnot(0, 1), ops.Qft(2),
+              ops.Operator(np.diag([1.0, 1.0, -1.0, 1j]))]:
+      for nbits_phase, target, offset in [(3, 3, 0), (3, 4, 1), (2, 4, 0)]:
+        nbits = target + 2 + 1
+        psi = state.rand_state(nbits)
+        res = ops.PhaseEstimation(u, psi, nbits_phase, target, offset)
+        self.assertTrue(res.is_close(
+            reference(u, psi, nbits_phase, target, offset), 1e-5))
+
+    powers = ops.UnitaryPowers(ops.Cnot(0, 1))
+    self.assertTrue(powers.is_diagonal())
+    self.assertTrue(np.allclose(powers.power(3), 1.0))
+
+    # Not diagonalizable, falls back to squaring the matrix.
+    u = ops.Operator([[1.0, 0.5], [0.0, 1.0]])
+    self.assertFalse(ops.UnitaryPowers(u).is_diagonal())
+    psi = state.State(np.random.randn(16) + 0j).normalize()
+    self.assertTrue(ops.PhaseEstimation(u, psi, 3, 3).is_close(
+        reference(u, psi, 3, 3, 0)))
+
   def test_padding(self):
     ident = ops.Identity(3)
     h = ops.Hadamard()
@@ -342,6 +444,31 @@ class OpsTest(absltest.TestCase):
       u = (rho + x @ rho @ x + y @ rho @ y + z @ rho @ z) / 2
       self.assertTrue(np.allclose(u, ident))
 
+  def test_trace_out(self):
+    nbits = 4
+    psi = state.rand_state(nbits)
+    rho = psi.density()
+    for index_set in [[0], [3], [1, 2], [2, 0], [0, 1, 3], [0, 1, 2, 3]]:
+      # Sum of (I x <i| x I) rho (I x |i> x I) over all values i
+      # of the traced out qubits.
+      expected = 0
+      for bits in helper.bitprod(len(index_set)):
+        proj = ops.Operator(1.0)
+        for idx in range(nbits):
+          if idx in index_set:
+            proj = proj * ops.Operator(
+                [[0.0, 1.0]] if bits[index_set.index(idx)] else [[1.0, 0.0]])
+          else:
+            proj = proj * ops.Identity()
+        expected = expected + proj @ rho @ proj.transpose()
+      reduced = ops.TraceOut(rho, index_set)
+      self.assertTrue(np.allclose(reduced, expected))
+      self.assertTrue(np.allclose(
+          reduced, psi.reduced_density(
+              [idx for idx in range(nbits) if idx not in index_set])))
+    self.assertTrue(np.allclose(ops.TraceOutSingle(rho, 2),
+                                ops.TraceOut(rho, [2])))
+
 
 if __name__ == '__main__':
   absltest.main()
@@ -10,6 +10,7 @@ from src.lib import ir
 def build_2d_grid(parm_ir):
   """Build simple grid with a column for each gate."""
 
+  parm_ir = parm_ir.expand()
   grid = []
   for g in parm_ir.gates:
     step = [None] * parm_ir.ngates
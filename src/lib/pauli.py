@@ -0,0 +1,262 @@
+# python3
+"""Pauli strings and sums of them, as observables."""
+
+# A Pauli string P = c * P_0 x P_1 x ... x P_(n-1), with P_i in
+# {I, X, Y, Z}, does not need a 2^n x 2^n matrix. It is fully described
+# by two bit masks over the state index (qubit 0 being the high bit,
+# as for states), and a coefficient c:
+#
+#     qubit i is X or Y  <=>  bit i of x is set
+#     qubit i is Z or Y  <=>  bit i of z is set
+#
+# X flips a bit and Z flips the sign of |1>. With Y = i X Z, the
+# number of Y's being popcount(x & z), P acts on a basis state as:
+#
+#     P |k> = c * i^popcount(x & z) * (-1)^popcount(k & z) |k ^ x>
+#
+# Hence the expectation value is a single pass over the state:
+#
+#     <psi|P|psi> = c * i^popcount(x & z) *
+#                   sum_k conj(psi[k ^ x]) (-1)^popcount(k & z) psi[k]
+#
+# Products and commutators also only need bit operations. Moving
+# Z^z1 past X^x2 gives a sign (-1)^popcount(z1 & x2), so two strings
+# commute if and only if popcount(x1 & z2) + popcount(z1 & x2) is even.
+
+import functools
+from typing import Dict, Iterable, Tuple, Union
+
+import numpy as np
+
+from src.lib import ops
+from src.lib import state
+
+
+def _popcount(val: int) -> int:
+  return bin(val).count('1')
+
+
+class PauliString:
+  """A tensor product of Pauli matrices, times a coefficient."""
+
+  def __init__(self, paulis: str, coeff: complex = 1.0):
+    self.nbits = len(paulis)
+    self.x = self.z = 0
+    for pauli in paulis.upper():
+      if pauli not in 'IXYZ':
+        raise ValueError(f'Invalid Pauli matrix: {pauli}')
+      self.x = (self.x << 1) | (pauli in 'XY')
+      self.z = (self.z << 1) | (pauli in 'YZ')
+    self.coeff = coeff
+
+  @classmethod
+  def from_masks(cls, nbits: int, x: int, z: int,
+                 coeff: complex = 1.0) -> 'PauliString':
+    res = cls('I' * nbits, coeff)
+    res.x, res.z = x, z
+    return res
+
+  @property
+  def paulis(self) -> str:
+    res = ''
+    for idx in range(self.nbits):
+      bit = 1 << (self.nbits - 1 - idx)
+      res += 'IXZY'[bool(self.x & bit) + 2 * bool(self.z & bit)]
+    return res
+
+  def __str__(self) -> str:
+    return f'{self.coeff} {self.paulis}'
+
+  def __repr__(self) -> str:
+    return f'PauliString({self.paulis!r}, {self.coeff!r})'
+
+  def __neg__(self) -> 'PauliString':
+    return PauliString.from_masks(self.nbits, self.x, self.z, -self.coeff)
+
+  def __mul__(self, other) -> Union['PauliString', 'PauliSum']:
+    """Product with another Pauli string (or sum) or a scalar."""
+
+    if isinstance(other, PauliSum):
+      return PauliSum([self]) * other
+    if not isinstance(other, PauliString):
+      return PauliString.from_masks(self.nbits, self.x, self.z,
+                                    self.coeff * other)
+    if self.nbits != other.nbits:
+      raise ValueError('Pauli strings have different sizes.')
+    # In the form i^popcount(x & z) X^x Z^z, the product is
+    # X^x1 Z^z1 X^x2 Z^z2 = (-1)^popcount(z1 & x2) X^(x1^x2) Z^(z1^z2).
+    x, z = self.x ^ other.x, self.z ^ other.z
+    power = (_popcount(self.x & self.z) + _popcount(other.x & other.z) +
+             2 * _popcount(self.z & other.x) - _popcount(x & z)) % 4
+    return PauliString.from_masks(self.nbits, x, z,
+                                  self.coeff * other.coeff * 1j**power)
+
+  def __rmul__(self, other) -> 'PauliString':
+    return self * other
+
+  def __add__(self, other) -> 'PauliSum':
+    return PauliSum([self]) + other
+
+  def __sub__(self, other) -> 'PauliSum':
+    return PauliSum([self]) + (-other)
+
+  def commutes(self, other: 'PauliString') -> bool:
+    """Check whether this string commutes with another one."""
+
+    return (_popcount(self.x & other.z) +
+            _popcount(self.z & other.x)) % 2 == 0
+
+  def expectation(self, psi: state.State) -> complex:
+    """Return <psi|P|psi>, in O(2^n)."""
+
+    if psi.nbits != self.nbits:
+      raise ValueError('State and Pauli string have different sizes.')
+    # psi[k ^ x] flips the axes of the X's and Y's, a view. The signs
+    # (-1)^popcount(k & z) are a Kronecker product of (1, 1) and
+    # (1, -1) factors.
+    view = np.asarray(psi).reshape([2] * self.nbits)
+    bits = [1 << (self.nbits - 1 - idx) for idx in range(self.nbits)]
+    flipped = np.flip(view, axis=tuple(idx for idx, bit in enumerate(bits)
+                                       if self.x & bit))
+    signs = functools.reduce(
+        np.kron, [np.array([1, -1] if self.z & bit else [1, 1], np.int8)
+                  for bit in bits], np.ones(1, np.int8))
+    total = np.vdot(flipped.reshape(-1), signs * np.asarray(psi))
+    return self.coeff * 1j**(_popcount(self.x & self.z) % 4) * complex(total)
+
+  def dense(self) -> ops.Operator:
+    """Return the full 2^n x 2^n matrix (for small n)."""
+
+    paulis = {'I': ops.Identity(), 'X': ops.PauliX(), 'Y': ops.PauliY(),
+              'Z': ops.PauliZ()}
+    return ops.Operator(self.coeff * functools.reduce(
+        np.kron, [np.asarray(paulis[p]) for p in self.paulis],
+        np.ones((1, 1))))
+
+
+class PauliSum:
+  """A sum of Pauli strings, such as a Hamiltonian."""
+
+  # Terms are kept by their masks, like terms are combined.
+  def __init__(self, terms: Iterable[PauliString] = ()):
+    self.nbits = None
+    self.terms: Dict[Tuple[int, int], complex] = {}
+    for term in terms:
+      self.add(term)
+
+  def add(self, term: PauliString) -> None:
+    if self.nbits is None:
+      self.nbits = term.nbits
+    if term.nbits != self.nbits:
+      raise ValueError('Pauli strings have different sizes.')
+    key = (term.x, term.z)
+    self.terms[key] = self.terms.get(key, 0.0) + term.coeff
+
+  def __iter__(self):
+    for (x, z), coeff in self.terms.items():
+      yield PauliString.from_masks(self.nbits, x, z, coeff)
+
+  def __len__(self) -> int:
+    return len(self.terms)
+
+  def __str__(self) -> str:
+    return ' + '.join(str(term) for term in self)
+
+  def __neg__(self) -> 'PauliSum':
+    return PauliSum(-term for term in self)
+
+  def __add__(self, other: Union[PauliString, 'PauliSum']) -> 'PauliSum':
+    res = PauliSum(self)
+    for term in ([other] if isinstance(other, PauliString) else other):
+      res.add(term)
+    return res
+
+  def __sub__(self, other: Union[PauliString, 'PauliSum']) -> 'PauliSum':
+    return self + (-other)
+
+  def __mul__(self, other) -> 'PauliSum':
+    """Product with a Pauli string or sum, or a scalar."""
+
+    if isinstance(other, PauliString):
+      other = PauliSum([other])
+    if not isinstance(other, PauliSum):
+      return PauliSum(term * other for term in self)
+    return PauliSum(a * b for a in self for b in other)
+
+  def __rmul__(self, other) -> 'PauliSum':
+    return PauliSum(other * term for term in self)
+
+  def commutes(self, other: Union[PauliString, 'PauliSum']) -> bool:
+    """Check whether all terms commute with all terms of other."""
+
+    if isinstance(other, PauliString):
+      other = [other]
+    return all(a.commutes(b) for a in self for b in other)
+
+  def expectation(self, psi: state.State) -> complex:
+    """Return <psi|H|psi>, in O(2^n) per term."""
+
+    return sum(term.expectation(psi) for term in self)
+
+  def dense(self) -> ops.Operator:
+    """Return the full 2^n x 2^n matrix (for small n)."""
+
+    return ops.Operator(sum(term.dense() for term in self))
+
+
+# Decomposing a 2^n x 2^n matrix M into Pauli strings, as
+#
+#     M = sum_P c_P P,   with  c_P = Tr(P M) / 2^n,
+#
+# does not need 4^n traces of full matrix products. Both the Pauli
+# strings and the trace factor over the qubits. With M viewed as a
+# tensor with one axis of size 4 per qubit, holding its row and column
+# bit (r, c), each qubit's 2x2 block is decomposed by the same 4x4
+# matrix T, with T[p, 2r + c] = P_p[c, r] / 2. Applying T along one
+# axis after another is a Walsh-Hadamard-style transform in O(n 4^n).
+# The inverse applies S[2r + c, p] = P_p[r, c] the same way.
+#
+# Coefficients are indexed by Pauli strings as base-4 numbers with
+# digits I=0, X=1, Y=2, Z=3, qubit 0 being the highest digit.
+_PAULIS = np.array([[[1, 0], [0, 1]], [[0, 1], [1, 0]],
+                    [[0, -1j], [1j, 0]], [[1, 0], [0, -1]]])
+_DECOMPOSE = np.transpose(_PAULIS, (0, 2, 1)).reshape(4, 4) / 2
+_RECONSTRUCT = _PAULIS.reshape(4, 4).T
+
+
+def _transform(tensor: np.ndarray, nbits: int, mat: np.ndarray) -> np.ndarray:
+  """Apply a 4x4 matrix along each of the nbits axes of size 4."""
+
+  res = np.asarray(tensor, dtype=np.complex128).reshape(-1)
+  for idx in range(nbits):
+    res = np.matmul(mat, res.reshape(4**idx, 4, -1))
+  return res.reshape(-1)
+
+
+def pauli_decompose(op: Union[ops.Operator, state.State]) -> np.ndarray:
+  """Return the coefficients of op (or of a state's rho) in Pauli strings."""
+
+  # For a state, rho = |psi><psi| is formed directly in the interleaved
+  # layout below. Its coefficients are <psi|P|psi> / 2^n.
+  op = np.asarray(op)
+  if op.ndim == 1:
+    op = np.outer(op, op.conj())
+  nbits = int(np.log2(op.shape[0]))
+  if op.shape != (1 << nbits, 1 << nbits):
+    raise ValueError('Pauli decomposition needs a 2^n x 2^n matrix.')
+  # Axes (r_0, ..., r_(n-1), c_0, ..., c_(n-1)) -> (r_0, c_0, r_1, ...).
+  order = [axis for idx in range(nbits) for axis in (idx, nbits + idx)]
+  tensor = np.transpose(op.reshape([2] * (2 * nbits)), order)
+  return _transform(tensor, nbits, _DECOMPOSE)
+
+
+def pauli_reconstruct(coeffs: np.ndarray) -> ops.Operator:
+  """Return the matrix sum_P c_P P for coefficients from pauli_decompose."""
+
+  nbits = int(np.log2(len(coeffs))) // 2
+  if len(coeffs) != 4**nbits:
+    raise ValueError('Pauli coefficients must have 4^n entries.')
+  tensor = _transform(coeffs, nbits, _RECONSTRUCT).reshape([2] * (2 * nbits))
+  order = list(range(0, 2 * nbits, 2)) + list(range(1, 2 * nbits, 2))
+  return ops.Operator(np.transpose(tensor, order).reshape(1 << nbits, -1))
+
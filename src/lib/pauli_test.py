@@ -0,0 +1,88 @@
+# python3
+import itertools
+import random
+
+from absl.testing import absltest
+import numpy as np
+
+from src.lib import ops
+from src.lib import pauli
+from src.lib import state
+
+
+class PauliTest(absltest.TestCase):
+
+  def test_masks(self):
+    p = pauli.PauliString('XIYZ', 0.5)
+    self.assertEqual(p.nbits, 4)
+    self.assertEqual(p.x, 0b1010)
+    self.assertEqual(p.z, 0b0011)
+    self.assertEqual(p.paulis, 'XIYZ')
+    self.assertTrue(np.allclose(
+        p.dense(), 0.5 * (ops.PauliX() * ops.Identity() * ops.PauliY() *
+                          ops.PauliZ())))
+    with self.assertRaises(ValueError):
+      pauli.PauliString('XA')
+
+  def test_expectation(self):
+    nbits = 3
+    psi = state.rand_state(nbits)
+    for paulis in itertools.product('IXYZ', repeat=nbits):
+      p = pauli.PauliString(''.join(paulis), 0.7 - 0.2j)
+      self.assertAlmostEqual(p.expectation(psi),
+                             np.vdot(psi, p.dense() @ psi), places=5)
+
+  def test_product(self):
+    nbits = 3
+    strings = [''.join(p) for p in itertools.product('IXYZ', repeat=nbits)]
+    for a in strings:
+      for b in random.sample(strings, 8):
+        p, q = pauli.PauliString(a, 2.0), pauli.PauliString(b, 1j)
+        dp, dq = p.dense(), q.dense()
+        self.assertTrue(np.allclose((p * q).dense(), dp @ dq))
+        self.assertEqual(p.commutes(q), np.allclose(dp @ dq, dq @ dp))
+
+  def test_sum(self):
+    nbits = 4
+    psi = state.rand_state(nbits)
+    h = (0.5 * pauli.PauliString('XZII') + pauli.PauliString('IYYI') -
+         pauli.PauliString('XZII') + pauli.PauliString('ZIIZ', 0.3))
+    self.assertLen(h, 3)
+    dense = h.dense()
+    self.assertTrue(np.allclose(
+        dense, -0.5 * (ops.PauliX() * ops.PauliZ() * ops.Identity(2)) +
+        ops.Identity() * ops.PauliY() * ops.PauliY() * ops.Identity() +
+        0.3 * (ops.PauliZ() * ops.Identity(2) * ops.PauliZ())))
+    self.assertAlmostEqual(h.expectation(psi), np.vdot(psi, dense @ psi),
+                           places=5)
+
+    g = pauli.PauliString('ZZZZ') + pauli.PauliString('XXII', 2.0)
+    self.assertTrue(np.allclose((h * g).dense(), dense @ g.dense()))
+    self.assertFalse(h.commutes(pauli.PauliString('ZIII')))
+    self.assertTrue(h.commutes(pauli.PauliString('IZZI')))
+    self.assertTrue(g.commutes(pauli.PauliString('YYYY')))
+
+  def test_decompose(self):
+    nbits = 3
+    strings = [''.join(p) for p in itertools.product('IXYZ', repeat=nbits)]
+    op = np.random.randn(1 << nbits, 1 << nbits) + 0.5j
+    coeffs = pauli.pauli_decompose(op)
+    self.assertLen(coeffs, 4**nbits)
+    for idx, p in enumerate(strings):
+      dense = pauli.PauliString(p).dense()
+      self.assertAlmostEqual(coeffs[idx], np.trace(dense @ op) / (1 << nbits))
+    self.assertTrue(np.allclose(pauli.pauli_reconstruct(coeffs), op))
+
+    psi = state.rand_state(nbits)
+    coeffs = pauli.pauli_decompose(psi)
+    for idx, p in enumerate(strings):
+      self.assertAlmostEqual(coeffs[idx] * (1 << nbits),
+                             pauli.PauliString(p).expectation(psi), places=5)
+    self.assertTrue(np.allclose(pauli.pauli_reconstruct(coeffs),
+                                psi.density()))
+    with self.assertRaises(ValueError):
+      pauli.pauli_decompose(np.ones((2, 4)))
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,54 @@
+# python3
+import random
+
+from absl.testing import absltest
+
+from src.lib import ops
+from src.lib import permutation_layer
+from src.lib import state
+
+
+class PermutationLayerTest(absltest.TestCase):
+
+  def test_index(self):
+    nbits = 6
+    psi = state.rand_state(nbits)
+    ref = psi.copy()
+    layer = permutation_layer.PermutationLayer()
+    for _ in range(30):
+      kind = random.randint(0, 3)
+      if kind == 0:
+        idx = random.randint(0, nbits - 1)
+        self.assertTrue(layer.add((idx,), ops.PauliX()))
+        ref.apply1(ops.PauliX(), idx)
+      elif kind == 1:
+        ctl, tgt = random.sample(range(nbits), 2)
+        self.assertTrue(layer.add((ctl, tgt), ops.Cnot(0, 1)))
+        ref.applyc(ops.PauliX(), ctl, tgt)
+      elif kind == 2:
+        q0, q1 = random.sample(range(nbits), 2)
+        self.assertTrue(layer.add((q0, q1), ops.Swap(0, 1)))
+        ref = ops.Swap(min(q0, q1), max(q0, q1))(ref, min(q0, q1))
+      else:
+        # Controlled by |0>.
+        ctl, tgt = random.sample(range(nbits), 2)
+        self.assertTrue(layer.add((ctl, tgt), ops.Cnot0(0, 1)))
+        ref.apply1(ops.PauliX(), ctl)
+        ref.applyc(ops.PauliX(), ctl, tgt)
+        ref.apply1(ops.PauliX(), ctl)
+    self.assertLen(layer, 30)
+
+    layer.apply(psi, nbits)
+    self.assertTrue(psi.is_close(ref))
+    self.assertEmpty(layer)
+
+  def test_not_permutation(self):
+    layer = permutation_layer.PermutationLayer()
+    self.assertFalse(layer.add((0,), ops.Hadamard()))
+    self.assertFalse(layer.add((0,), ops.PauliY()))
+    self.assertFalse(layer.add((0, 1), ops.ControlledU(0, 1, ops.PauliZ())))
+    self.assertEmpty(layer)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,101 @@
+# python3
+"""Accumulate diagonal gates into a single phase layer."""
+
+# Diagonal gates, such as Z, S, T, U1, Rz, CZ, or CU1, all commute with
+# each other. A QFT-based adder applies O(n^2) of them in a row, each
+# one a pass over the state vector. Instead, we collect them here and
+# only multiply the state once, with the product of all their phases,
+# when a non-diagonal gate on one of the involved qubits arrives.
+#
+# The product of diagonal gates on one or two qubits is a function
+# over the bits x_i of the state index of the form:
+#
+#     c * prod_i lin_i^x_i * prod_{i<j} quad_ij^(x_i * x_j)
+#
+# For example, U1(phi) on qubit i contributes lin_i = exp(i*phi),
+# and CU1(phi) on qubits i, j contributes quad_ij = exp(i*phi).
+# We only keep the factors c, lin, and quad. The full vector of
+# phases is materialized on demand, in O(2^n) (see vector()).
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+class PhaseLayer:
+  """Lazily materialized product of diagonal 1- and 2-qubit gates."""
+
+  def __init__(self):
+    self.clear()
+
+  def clear(self) -> None:
+    self.const = 1.0 + 0j
+    self.lin: Dict[int, complex] = {}
+    self.quad: Dict[Tuple[int, int], complex] = {}
+    self.qubits = set()
+    self.ngates = 0
+    # The gates themselves, for callers that prefer to apply
+    # short layers gate by gate.
+    self.blocks = []
+
+  def __len__(self) -> int:
+    return self.ngates
+
+  def add(self, qubits, diag: np.ndarray) -> bool:
+    """Add diagonal gate on qubits, return False if it can't be absorbed."""
+
+    # diag holds the gate's diagonal on the basis |q0> or |q0 q1>,
+    # with q0 being the higher-order bit.
+    diag = np.asarray(diag, dtype=np.complex128)
+    if np.any(np.abs(diag) < 1e-12):
+      return False
+    if len(qubits) == 1:
+      self.const *= diag[0]
+      self.mul(self.lin, qubits[0], diag[1] / diag[0])
+    else:
+      a, b = qubits
+      t00, t01, t10, t11 = diag
+      if a > b:
+        a, b, t01, t10 = b, a, t10, t01
+      self.const *= t00
+      self.mul(self.lin, a, t10 / t00)
+      self.mul(self.lin, b, t01 / t00)
+      self.mul(self.quad, (a, b), t11 * t00 / (t10 * t01))
+    self.qubits.update(qubits)
+    self.ngates += 1
+    return True
+
+  @staticmethod
+  def mul(factors: Dict, key, val: complex) -> None:
+    factors[key] = factors.get(key, 1.0) * val
+
+  def vector(self, nbits: int, dtype=np.complex128) -> np.ndarray:
+    """Materialize the 2^nbits phases over the state index."""
+
+    # Build the vector one qubit at a time, from the last qubit to the
+    # first, adding qubit k as the new highest-order bit. The upper
+    # half of the new vector is the lower half times lin_k, times
+    # quad_kq for each bit q that is set in the index. These factors
+    # only depend on the qubits up to the last partner q of k, and are
+    # computed with the same doubling scheme. Qubit k costs O(2^(n-k)),
+    # the full vector O(2^nbits).
+    by_first = {}
+    for (k, q), val in self.quad.items():
+      by_first.setdefault(k, {})[q] = val
+
+    phases = np.full(1, self.const, dtype=dtype)
+    for k in reversed(range(nbits)):
+      factor = np.full(1, self.lin.get(k, 1.0), dtype=dtype)
+      pairs = by_first.get(k, {})
+      for q in range(k + 1, max(pairs, default=k) + 1):
+        factor = np.multiply.outer(
+            factor, np.array([1.0, pairs.get(q, 1.0)], dtype=dtype)).ravel()
+      upper = phases.reshape(factor.size, -1) * factor[:, np.newaxis]
+      phases = np.concatenate([phases, upper.ravel()])
+    return phases
+
+  def apply(self, psi: np.ndarray, nbits: int) -> None:
+    """Multiply psi in place with all accumulated phases, then clear."""
+
+    psi *= self.vector(nbits, psi.dtype)
+    self.clear()
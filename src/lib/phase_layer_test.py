@@ -0,0 +1,46 @@
+# python3
+import random
+
+from absl.testing import absltest
+import numpy as np
+
+from src.lib import ops
+from src.lib import phase_layer
+from src.lib import state
+
+
+class PhaseLayerTest(absltest.TestCase):
+
+  def test_vector(self):
+    nbits = 6
+    psi = state.rand_state(nbits)
+    ref = psi.copy()
+    layer = phase_layer.PhaseLayer()
+    for _ in range(30):
+      theta = random.random() * 2 * np.pi
+      if random.randint(0, 1):
+        idx = random.randint(0, nbits - 1)
+        gate = random.choice([ops.U1(theta), ops.RotationZ(theta),
+                              ops.PauliZ(), ops.Sgate()])
+        self.assertTrue(layer.add((idx,), np.diagonal(gate)))
+        ref.apply1(gate, idx)
+      else:
+        ctl, tgt = random.sample(range(nbits), 2)
+        gate = random.choice([ops.U1(theta), ops.RotationZ(theta)])
+        cgate = ops.ControlledU(0, 1, gate)
+        self.assertTrue(layer.add((ctl, tgt), np.diagonal(cgate)))
+        ref.applyc(gate, ctl, tgt)
+    self.assertLen(layer, 30)
+
+    layer.apply(psi, nbits)
+    self.assertTrue(psi.is_close(ref))
+    self.assertEmpty(layer)
+
+  def test_non_unitary(self):
+    layer = phase_layer.PhaseLayer()
+    self.assertFalse(layer.add((0,), np.array([1.0, 0.0])))
+    self.assertEmpty(layer)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,50 @@
+# python3
+"""Run independent experiments concurrently on a thread pool."""
+
+# The libxgates kernels release the GIL while they update a state
+# vector. Many algorithms in this code base run the same experiment
+# over and over with different parameters (Grover with different qubit
+# counts, VQE with random angles, etc.). These experiments are
+# independent and can run in Python threads. Each thread builds its
+# own circuit.qc, and whenever a thread is inside a libxgates kernel,
+# the other threads can make progress.
+#
+# Note that the kernels themselves may also be multi-threaded, as
+# set by --xgates_threads. Combining both can oversubscribe the
+# available cores.
+#
+# Usage, analogous to Python's map():
+#
+#   results = runner.run_concurrent(run_experiment, [3, 4, 5], [1, 1, 1])
+#
+# runs run_experiment(3, 1), run_experiment(4, 1), run_experiment(5, 1)
+# concurrently and returns the results in order.
+
+from concurrent import futures
+from typing import Any, Callable, Iterable, List
+
+from absl import flags
+
+
+flags.DEFINE_integer('experiment_threads', 0,
+                     'Number of threads for concurrent experiments ' +
+                     '(0: Python default)')
+
+
+def experiment_threads() -> int:
+  """Return number of threads for concurrent experiments."""
+
+  try:  # May be neccessary for interactive use.
+    return flags.FLAGS.experiment_threads
+  except Exception:  # pylint: disable=broad-except
+    return 0
+
+
+def run_concurrent(experiment: Callable[..., Any], *params: Iterable[Any],
+                   nthreads: int = None) -> List[Any]:
+  """Run experiment over the zipped params concurrently, return results."""
+
+  if nthreads is None:
+    nthreads = experiment_threads()
+  with futures.ThreadPoolExecutor(max_workers=nthreads or None) as pool:
+    return list(pool.map(experiment, *params))
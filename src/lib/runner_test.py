@@ -0,0 +1,40 @@
+# python3
+import math
+
+from absl.testing import absltest
+import numpy as np
+
+from src.lib import circuit
+from src.lib import runner
+
+
+def run_circuit(nbits: int, theta: float) -> np.ndarray:
+  qc = circuit.qc('runner')
+  qc.reg(nbits, 0)
+  for _ in range(5):
+    for i in range(nbits):
+      qc.h(i)
+      qc.rz(i, theta)
+    for i in range(nbits - 1):
+      qc.cx(i, i + 1)
+  return qc.psi
+
+
+class RunnerTest(absltest.TestCase):
+
+  def test_order(self):
+    res = runner.run_concurrent(lambda a, b: a * b,
+                                range(10), range(10, 20), nthreads=4)
+    self.assertEqual(res, [a * b for a, b in zip(range(10), range(10, 20))])
+
+  def test_concurrent_circuits(self):
+    nbits = [6, 7, 8, 9] * 4
+    thetas = [math.pi / (i + 1) for i in range(len(nbits))]
+    results = runner.run_concurrent(run_circuit, nbits, thetas, nthreads=4)
+    for n, theta, psi in zip(nbits, thetas, results):
+      self.assertEqual(psi.nbits, n)
+      self.assertTrue(psi.is_close(run_circuit(n, theta)))
+
+
+if __name__ == '__main__':
+  absltest.main()
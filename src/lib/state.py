@@ -18,6 +18,55 @@ class State(tensor.Tensor):
   def density(self) -> tensor.Tensor:
     return tensor.Tensor(np.outer(self, self.conj()))
 
+  def bipartition(self, qubits: List[int]) -> np.ndarray:
+    """Return psi as a matrix, with qubits as rows and all others as columns."""
+
+    qubits = list(qubits)
+    others = [idx for idx in range(self.nbits) if idx not in qubits]
+    return np.transpose(np.asarray(self).reshape([2] * self.nbits),
+                        qubits + others).reshape(1 << len(qubits), -1)
+
+  def reduced_density(self, keep_qubits: List[int]) -> tensor.Tensor:
+    """Return the density matrix of qubits, with all others traced out."""
+
+    # This is ops.TraceOut(self.density(), others), without ever
+    # building the full density matrix. With psi reshaped to a matrix
+    # M, with the kept qubits as rows and the traced out ones as columns,
+    # the reduced density matrix is M M^dagger.
+    mat = self.bipartition(keep_qubits)
+    return tensor.Tensor(mat @ mat.conj().T)
+
+  def schmidt(
+      self, qubits: List[int]
+  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Schmidt decomposition across qubits and all other qubits."""
+
+    # With psi as the matrix M = U S V^dagger, the singular values are
+    # the Schmidt coefficients and the columns of U and the rows of
+    # V^dagger the bases of the two subsystems:
+    #
+    #   psi = sum_i coeffs[i] * kron(u[:, i], vh[i, :])
+    #
+    # (with the qubits of the first subsystem moved to the front).
+    # A single SVD of a 2^k x 2^(n-k) matrix, instead of the
+    # eigendecompositions of two reduced density matrices.
+    u, coeffs, vh = np.linalg.svd(self.bipartition(qubits),
+                                  full_matrices=False)
+    return coeffs, u, vh
+
+  def entropy(self, qubits: List[int]) -> float:
+    """Return the entanglement entropy (in bits) of qubits with the rest."""
+
+    # The squared Schmidt coefficients are the eigenvalues of the
+    # reduced density matrix of either side. We only need those of the
+    # smaller one, which is much cheaper than an SVD of psi.
+    mat = self.bipartition(qubits)
+    if mat.shape[0] > mat.shape[1]:
+      mat = mat.T
+    probs = np.linalg.eigvalsh(mat @ mat.conj().T).astype(np.float64)
+    probs = probs[probs > 0.0]
+    return float(-np.sum(probs * np.log2(probs)))
+
   def adjoint(self):
     return self.conj().transpose()
 
@@ -40,6 +89,38 @@ class State(tensor.Tensor):
     amplitude = self.ampl(*bits)
     return np.real(amplitude.conj() * amplitude)
 
+  def probabilities(self, qubits: List[int]) -> np.ndarray:
+    """Return the probabilities of all values of (a register of) qubits."""
+
+    # The marginal distribution is a sum of the squared magnitudes over
+    # all other qubits, in O(2^n). Entry i is the probability of the
+    # qubits holding value i, with qubits[0] as the highest-order bit.
+    #
+    # Runs of adjacent qubits that are all kept (or all summed over)
+    # become a single axis. Summing over a short innermost axis is
+    # slow in numpy, for that one, we use a matmul instead.
+    qubits = list(qubits)
+    shape, summed = [], []
+    for idx in range(self.nbits):
+      if idx and (idx in qubits) != summed[-1]:
+        shape[-1] *= 2
+      else:
+        shape.append(2)
+        summed.append(idx not in qubits)
+    probs = np.square(np.abs(np.asarray(self)), dtype=np.float64)
+    probs = probs.reshape(shape)
+    if summed[-1]:
+      probs = probs @ np.ones(shape[-1])
+      summed = summed[:-1]
+    axes = tuple(axis for axis, s in enumerate(summed) if s)
+    if axes:
+      probs = np.sum(probs, axis=axes)
+    order = sorted(qubits)
+    if order != qubits:
+      probs = np.transpose(probs.reshape([2] * len(qubits)),
+                           [order.index(q) for q in qubits])
+    return probs.reshape(-1)
+
   def phase(self, *bits: Tuple[int, ...]) -> float:
     """Return phase of a state from the complex amplitude."""
 
@@ -247,6 +328,13 @@ def rand_bits(n: int) -> State:
   return bitstring(*bits)
 
 
+def rand_state(n: int) -> State:
+  """Produce random normalized state with complex amplitudes."""
+
+  return State(np.random.randn(1 << n) +
+               1j * np.random.randn(1 << n)).normalize()
+
+
 class Reg(list):
   """Simple register class, derive from list."""
 
@@ -156,6 +156,64 @@ class StateTest(absltest.TestCase):
     self.assertFalse(s0.diff(s1, False))
     self.assertTrue(s0.diff(s0, False))
 
+  def test_probabilities(self) -> None:
+    nbits = 6
+    psi = state.rand_state(nbits)
+    for qubits in [[], [0], [5], [1, 2], [2, 1], [0, 5, 3], [4, 3, 2, 1],
+                   list(range(nbits)), random.sample(range(nbits), 4)]:
+      expected = np.zeros(1 << len(qubits))
+      for idx in range(1 << nbits):
+        val = 0
+        for q in qubits:
+          val = 2 * val + ((idx >> (nbits - 1 - q)) & 1)
+        expected[val] += abs(psi[idx])**2
+      self.assertTrue(np.allclose(psi.probabilities(qubits), expected))
+
+  def test_reduced_density(self) -> None:
+    nbits = 5
+    psi = state.rand_state(nbits)
+    rho = psi.reduced_density([3, 1])
+    self.assertEqual(rho.shape, (4, 4))
+    self.assertTrue(rho.is_hermitian())
+    self.assertTrue(np.isclose(np.trace(rho), 1.0))
+    # Diagonal entries are the probabilities of qubits 3 and 1.
+    self.assertTrue(np.allclose(np.diagonal(rho),
+                                psi.probabilities([3, 1])))
+    self.assertTrue(np.allclose(psi.reduced_density(range(nbits)),
+                                psi.density()))
+
+  def test_schmidt(self) -> None:
+    nbits = 6
+    psi = state.rand_state(nbits)
+    qubits = [4, 1]
+    others = [0, 2, 3, 5]
+    coeffs, u, vh = psi.schmidt(qubits)
+    self.assertLen(coeffs, 4)
+    self.assertAlmostEqual(np.sum(coeffs**2), 1.0, places=5)
+    self.assertTrue(np.allclose(
+        np.sort(coeffs**2),
+        np.linalg.eigvalsh(psi.reduced_density(qubits)), atol=1e-6))
+
+    # Rebuild psi, with the qubits moved back into place.
+    mat = sum(c * np.kron(u[:, i], vh[i, :]) for i, c in enumerate(coeffs))
+    rebuilt = np.transpose(mat.reshape([2] * nbits),
+                           np.argsort(qubits + others)).reshape(-1)
+    self.assertTrue(np.allclose(rebuilt, psi, atol=1e-5))
+
+  def test_entropy(self) -> None:
+    self.assertAlmostEqual(state.zeros(4).entropy([0, 1]), 0.0, places=5)
+    self.assertAlmostEqual(state.plus(4).entropy([2]), 0.0, places=5)
+
+    # A GHZ state has one bit of entanglement across any cut.
+    ghz = state.State(np.zeros(1 << 5))
+    ghz[0] = ghz[-1] = 1 / np.sqrt(2)
+    for qubits in [[0], [1, 3], [4, 2, 0]]:
+      self.assertAlmostEqual(ghz.entropy(qubits), 1.0, places=5)
+
+    psi = state.rand_state(6)
+    self.assertAlmostEqual(psi.entropy([0, 3]), psi.entropy([1, 2, 4, 5]),
+                           places=4)
+
 
 if __name__ == '__main__':
   absltest.main()
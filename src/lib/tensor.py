@@ -20,12 +20,18 @@ import numpy as np
 #   bazel run algorithm -- --tensor_width=128
 #   python3 algorithm.py --tensor_width=128
 #
+# Similarly, the number of threads used by the libxgates kernels
+# is set with --xgates_threads (with 0 meaning all available cores).
+# States with less than 2^16 amplitudes always run single-threaded.
+#
 # For the interactive use in a Python REPL, it is possible that
 # the absl command-line parser has not yet been called. This is why
 # we bracked tensor_width() in an exception block.
 
 
 flags.DEFINE_integer('tensor_width', 64, 'Bitwidth of FP numbers (64 or 128)')
+flags.DEFINE_integer('xgates_threads', 1,
+                     'Number of threads for libxgates kernels (0: all cores)')
 
 
 def tensor_width():
@@ -37,6 +43,15 @@ def tensor_width():
     return 64
 
 
+def xgates_threads():
+  """Return number of threads for the libxgates kernels."""
+
+  try:  # May be neccessary for interactive use.
+    return flags.FLAGS.xgates_threads
+  except Exception:
+    return 1
+
+
 # All vectors/matrices in this package will use this base type.
 # Valid values are np.complex128 or np.complex64
 def tensor_type():
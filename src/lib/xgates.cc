@@ -4,7 +4,11 @@
 
 #include <stdio.h>
 #include <stdlib.h>
+#include <cmath>
 #include <complex>
+#include <functional>
+#include <thread>
+#include <vector>
 
 #include <numpy/ndarraytypes.h>
 #include <numpy/ufuncobject.h>
@@ -13,6 +17,59 @@
 typedef std::complex<double> cmplxd;
 typedef std::complex<float> cmplxf;
 
+// States with fewer than 2^kMinParallelBits amplitudes are always
+// processed on a single thread. For those, the cost to start
+// the threads is higher than the gain from parallelization.
+static const int kMinParallelBits = 16;
+
+// run_chunk calls body(begin, end). All chunks, on any thread, run
+// through this single out-of-line copy of the loop. Otherwise, the
+// compiler may specialize an inlined call, eg., for begin == 0, and
+// with -ffast-math, the specialized code may round differently. The
+// results would then depend on the number of threads.
+template <typename body_type>
+__attribute__((noinline)) void run_chunk(const body_type &body,
+                                         int begin, int end) {
+  body(begin, end);
+}
+
+// parallel_for splits the iteration space [0, count) into nthreads
+// contiguous chunks and calls body(begin, end) for each of them.
+// The calling thread processes the first chunk. A thread count of
+// 0 means to use all available cores.
+template <typename body_type>
+void parallel_for(int nthreads, int nbits, int count, body_type body) {
+  if (nthreads <= 0) {
+    nthreads = std::thread::hardware_concurrency();
+  }
+  if (nthreads > count) {
+    nthreads = count;
+  }
+  if (nthreads <= 1 || nbits < kMinParallelBits) {
+    run_chunk(body, 0, count);
+    return;
+  }
+
+  std::vector<std::thread> threads;
+  int chunk = (count + nthreads - 1) / nthreads;
+  for (int begin = chunk; begin < count; begin += chunk) {
+    int end = begin + chunk < count ? begin + chunk : count;
+    threads.emplace_back(run_chunk<body_type>, std::cref(body), begin, end);
+  }
+  run_chunk(body, 0, chunk);
+  for (auto &t : threads) {
+    t.join();
+  }
+}
+
+// For a (reversed) target qubit index tgt, compute the index of the
+// k-th amplitude with a 0 at bit position tgt. Its partner with a
+// 1 at position tgt is found at offset 1 << tgt. In other words, this
+// inserts a 0 bit into k at position tgt.
+inline int pair_index(int k, int tgt) {
+  return ((k >> tgt) << (tgt + 1)) | (k & ((1 << tgt) - 1));
+}
+
 // apply1 applies a single gate to a state.
 //
 // Gates are typically 2x2 matrices, but in this implementation they
@@ -20,9 +77,12 @@ typedef std::complex<float> cmplxf;
 //   |  a  b |
 //   |  c  d |  -> | a b c d |
 //
+// The 2^(nbits-1) amplitude pairs are independent of each other and
+// are distributed over nthreads threads.
+//
 template <typename cmplx_type>
 void apply1(cmplx_type *psi, cmplx_type gate[4],
-            int nbits, int tgt) {
+            int nbits, int tgt, int nthreads) {
   tgt = nbits - tgt - 1;
   int q2 = 1 << tgt;
   if (q2 < 0) {
@@ -30,21 +90,22 @@ void apply1(cmplx_type *psi, cmplx_type gate[4],
     fprintf(stderr, "             Perhaps using wrongly shaped state?\n");
     exit(EXIT_FAILURE);
   }
-  for (int g = 0; g < 1 << nbits; g += (1 << (tgt+1))) {
-    for (int i = g; i < g + q2; ++i) {
+  parallel_for(nthreads, nbits, 1 << (nbits - 1), [=](int begin, int end) {
+    for (int k = begin; k < end; ++k) {
+      int i = pair_index(k, tgt);
       cmplx_type t1 = gate[0] * psi[i] + gate[1] * psi[i + q2];
       cmplx_type t2 = gate[2] * psi[i] + gate[3] * psi[i + q2];
       psi[i] = t1;
       psi[i + q2] = t2;
     }
-  }
+  });
 }
 
 // applyc applies a controlled gate to a state.
 //
 template <typename cmplx_type>
 void applyc(cmplx_type *psi, cmplx_type gate[4],
-            int nbits, int ctl, int tgt) {
+            int nbits, int ctl, int tgt, int nthreads) {
   tgt = nbits - tgt - 1;
   ctl = nbits - ctl - 1;
   int q2 = 1 << tgt;
@@ -53,37 +114,282 @@ void applyc(cmplx_type *psi, cmplx_type gate[4],
     fprintf(stderr, "             Perhaps using wrongly shaped state?\n");
     exit(EXIT_FAILURE);
   }
-  for (int g = 0; g < 1 << nbits; g += 1 << (tgt+1)) {
-    for (int i = g; i < g + q2; ++i) {
-      int idx = g * (1 << nbits) + i;
-      if (idx & (1 << ctl)) {
+  // A controller outside of the state can never be |1>.
+  if (ctl < 0 || ctl >= nbits) {
+    return;
+  }
+  parallel_for(nthreads, nbits, 1 << (nbits - 1), [=](int begin, int end) {
+    for (int k = begin; k < end; ++k) {
+      int i = pair_index(k, tgt);
+      if (i & (1 << ctl)) {
+        cmplx_type t1 = gate[0] * psi[i] + gate[1] * psi[i + q2];
+        cmplx_type t2 = gate[2] * psi[i] + gate[3] * psi[i + q2];
+        psi[i] = t1;
+        psi[i + q2] = t2;
+      }
+    }
+  });
+}
+
+// apply2 applies a two-qubit gate to a state.
+//
+// The 4x4 gate is flattened to a 1x16 array, row by row. It operates
+// on the basis states |q0 q1>, with q0 being the higher-order bit:
+//   |00>, |01>, |10>, |11>
+//
+// The 2^(nbits-2) groups of 4 amplitudes are independent of each other
+// and are distributed over nthreads threads.
+//
+template <typename cmplx_type>
+void apply2(cmplx_type *psi, cmplx_type gate[16],
+            int nbits, int q0, int q1, int nthreads) {
+  q0 = nbits - q0 - 1;
+  q1 = nbits - q1 - 1;
+  if (q0 < 0 || q1 < 0 || q0 == q1) {
+    fprintf(stderr, "***Error***: Invalid qubit index in apply2().\n");
+    fprintf(stderr, "             Perhaps using wrongly shaped state?\n");
+    exit(EXIT_FAILURE);
+  }
+  int lo = q0 < q1 ? q0 : q1;
+  int hi = q0 < q1 ? q1 : q0;
+  int m0 = 1 << q0;
+  int m1 = 1 << q1;
+  parallel_for(nthreads, nbits, 1 << (nbits - 2), [=](int begin, int end) {
+    for (int k = begin; k < end; ++k) {
+      int i = pair_index(pair_index(k, lo), hi);
+      int idx[4] = {i, i | m1, i | m0, i | m0 | m1};
+      cmplx_type v[4] = {psi[idx[0]], psi[idx[1]], psi[idx[2]], psi[idx[3]]};
+      for (int r = 0; r < 4; ++r) {
+        psi[idx[r]] = gate[4 * r] * v[0] + gate[4 * r + 1] * v[1] +
+                      gate[4 * r + 2] * v[2] + gate[4 * r + 3] * v[3];
+      }
+    }
+  });
+}
+
+// applymc applies a multi-controlled gate to a state.
+//
+// The controlling qubits are given as a bit mask over the state
+// vector index, with bit (nbits - 1 - q) set for each controlling
+// qubit q. The gate is only applied to those amplitude pairs whose
+// controlling bits match ctl_value_mask. A controller by |1> sets the
+// corresponding bit in ctl_value_mask, a controller by |0> leaves it
+// unset. This allows to simulate multi-controlled gates directly,
+// without any ancilla qubits.
+//
+template <typename cmplx_type>
+void applymc(cmplx_type *psi, cmplx_type gate[4], int nbits,
+             int ctl_mask, int ctl_value_mask, int tgt, int nthreads) {
+  tgt = nbits - tgt - 1;
+  int q2 = 1 << tgt;
+  if (q2 < 0 || (ctl_mask & q2)) {
+    fprintf(stderr, "***Error***: Invalid qubit index in applymc().\n");
+    fprintf(stderr, "             Perhaps using wrongly shaped state?\n");
+    exit(EXIT_FAILURE);
+  }
+  parallel_for(nthreads, nbits, 1 << (nbits - 1), [=](int begin, int end) {
+    for (int k = begin; k < end; ++k) {
+      int i = pair_index(k, tgt);
+      if ((i & ctl_mask) == ctl_value_mask) {
         cmplx_type t1 = gate[0] * psi[i] + gate[1] * psi[i + q2];
         cmplx_type t2 = gate[2] * psi[i] + gate[3] * psi[i + q2];
         psi[i] = t1;
         psi[i + q2] = t2;
       }
     }
+  });
+}
+
+// applymcd applies a diagonal, multi-controlled gate to a state.
+//
+// Diagonal gates, such as Z, S, T, U1, or Rz, only change the phases
+// of the amplitudes. The gate is passed as its 2 diagonal elements.
+// Amplitudes are only multiplied if their controlling bits match
+// (see applymc) and if the diagonal element for the target bit is
+// not 1. For example, a controlled U1 gate only touches a quarter
+// of the state vector. Passing a ctl_mask of 0 applies the gate
+// without controllers.
+//
+template <typename cmplx_type>
+void applymcd(cmplx_type *psi, cmplx_type diag[2], int nbits,
+              int ctl_mask, int ctl_value_mask, int tgt, int nthreads) {
+  tgt = nbits - tgt - 1;
+  int q2 = 1 << tgt;
+  if (q2 < 0 || (ctl_mask & q2)) {
+    fprintf(stderr, "***Error***: Invalid qubit index in applymcd().\n");
+    fprintf(stderr, "             Perhaps using wrongly shaped state?\n");
+    exit(EXIT_FAILURE);
+  }
+  bool skip0 = diag[0] == cmplx_type(1);
+  bool skip1 = diag[1] == cmplx_type(1);
+  parallel_for(nthreads, nbits, 1 << (nbits - 1), [=](int begin, int end) {
+    for (int k = begin; k < end; ++k) {
+      int i = pair_index(k, tgt);
+      if ((i & ctl_mask) == ctl_value_mask) {
+        if (!skip0) psi[i] *= diag[0];
+        if (!skip1) psi[i + q2] *= diag[1];
+      }
+    }
+  });
+}
+
+// applyh applies a Hadamard gate to each qubit in qubit_mask, as an
+// in-place fast Walsh-Hadamard transform. As for applymc, the mask is
+// over the bits of the state index.
+//
+// Instead of one pass over the state per qubit, all the butterflies
+// on the low index bits are done in blocks of 2^kBlockBits amplitudes,
+// which stay in the cache. The remaining high bits are done two at a
+// time. The normalization by 1/sqrt(2^k) is folded into the last pass.
+//
+static const int kBlockBits = 12;
+
+template <typename cmplx_type>
+void applyh(cmplx_type *psi, int nbits, int qubit_mask, int nthreads) {
+  typedef typename cmplx_type::value_type real_type;
+  qubit_mask &= (1 << nbits) - 1;
+  if (!qubit_mask) {
+    return;
+  }
+  real_type scale = std::pow(2.0, -0.5 * __builtin_popcount(qubit_mask));
+  int block_bits = nbits < kBlockBits ? nbits : kBlockBits;
+  int low = qubit_mask & ((1 << block_bits) - 1);
+  int high = qubit_mask & ~low;
+
+  if (low) {
+    int top = 31 - __builtin_clz(low);
+    parallel_for(nthreads, nbits, 1 << (nbits - block_bits),
+                 [=](int begin, int end) {
+      for (int b = begin; b < end; ++b) {
+        cmplx_type *block = psi + (static_cast<long>(b) << block_bits);
+        for (int t = 0; t <= top; ++t) {
+          if (!(low & (1 << t))) {
+            continue;
+          }
+          real_type f = (t == top && !high) ? scale : 1;
+          int q2 = 1 << t;
+          for (int k = 0; k < (1 << (block_bits - 1)); ++k) {
+            int i = pair_index(k, t);
+            cmplx_type a = block[i];
+            cmplx_type c = block[i + q2];
+            block[i] = f * (a + c);
+            block[i + q2] = f * (a - c);
+          }
+        }
+      }
+    });
+  }
+
+  while (high) {
+    int t1 = __builtin_ctz(high);
+    high &= high - 1;
+    int q1 = 1 << t1;
+    if (!high) {
+      real_type f = scale;
+      parallel_for(nthreads, nbits, 1 << (nbits - 1),
+                   [=](int begin, int end) {
+        for (int k = begin; k < end; ++k) {
+          int i = pair_index(k, t1);
+          cmplx_type a = psi[i];
+          cmplx_type c = psi[i + q1];
+          psi[i] = f * (a + c);
+          psi[i + q1] = f * (a - c);
+        }
+      });
+      break;
+    }
+    int t2 = __builtin_ctz(high);
+    high &= high - 1;
+    int q2 = 1 << t2;
+    real_type f = high ? 1 : scale;
+    parallel_for(nthreads, nbits, 1 << (nbits - 2), [=](int begin, int end) {
+      for (int k = begin; k < end; ++k) {
+        int i = pair_index(pair_index(k, t1), t2);
+        cmplx_type s0 = psi[i] + psi[i + q1];
+        cmplx_type d0 = psi[i] - psi[i + q1];
+        cmplx_type s1 = psi[i + q2] + psi[i + q1 + q2];
+        cmplx_type d1 = psi[i + q2] - psi[i + q1 + q2];
+        psi[i] = f * (s0 + s1);
+        psi[i + q1] = f * (d0 + d1);
+        psi[i + q2] = f * (s0 - s1);
+        psi[i + q1 + q2] = f * (d0 - d1);
+      }
+    });
   }
 }
 
 // ---------------------------------------------------------------
 // Python wrapper functions to call above accelerators.
+//
+// The wrappers convert and validate the numpy arrays while holding
+// the GIL. The kernels themselves only touch the array data, so
+// they run with the GIL released. This allows Python threads to
+// simulate independent circuits concurrently.
 
-template <typename cmplx_type, int npy_type>
-void apply1_python(PyObject *param_psi, PyObject *param_gate,
-                   int nbits, int tgt) {
-  PyArrayObject *psi_arr =
+// get_state converts psi to a numpy array of type npy_type and checks
+// that it is large enough for nbits qubits. On failure, a Python
+// exception is set and false is returned.
+template <int npy_type>
+bool get_state(PyObject *param_psi, int nbits, PyArrayObject **psi_arr) {
+  if (nbits < 1 || nbits > 30) {
+    PyErr_SetString(PyExc_ValueError, "Invalid number of qubits.");
+    return false;
+  }
+  *psi_arr =
       (PyArrayObject*) PyArray_FROM_OTF(param_psi, npy_type, NPY_IN_ARRAY);
-  cmplx_type *psi = ((cmplx_type *)PyArray_GETPTR1(psi_arr, 0));
+  if (*psi_arr == NULL) {
+    return false;
+  }
+  if (PyArray_SIZE(*psi_arr) < (1 << nbits)) {
+    PyErr_SetString(PyExc_ValueError, "State too small.");
+    Py_DECREF(*psi_arr);
+    return false;
+  }
+  return true;
+}
 
-  PyArrayObject *gate_arr =
-    (PyArrayObject*) PyArray_FROM_OTF(param_gate, npy_type, NPY_IN_ARRAY);
+// get_arrays converts psi and gate to numpy arrays of type npy_type and
+// checks that they are large enough for nbits qubits and the gate.
+// On failure, a Python exception is set and false is returned.
+template <int npy_type>
+bool get_arrays(PyObject *param_psi, PyObject *param_gate,
+                int nbits, int gate_size,
+                PyArrayObject **psi_arr, PyArrayObject **gate_arr) {
+  if (!get_state<npy_type>(param_psi, nbits, psi_arr)) {
+    return false;
+  }
+  *gate_arr =
+      (PyArrayObject*) PyArray_FROM_OTF(param_gate, npy_type, NPY_IN_ARRAY);
+  if (*gate_arr == NULL) {
+    Py_DECREF(*psi_arr);
+    return false;
+  }
+  if (PyArray_SIZE(*gate_arr) < gate_size) {
+    PyErr_SetString(PyExc_ValueError, "Gate too small.");
+    Py_DECREF(*psi_arr);
+    Py_DECREF(*gate_arr);
+    return false;
+  }
+  return true;
+}
+
+template <typename cmplx_type, int npy_type>
+bool apply1_python(PyObject *param_psi, PyObject *param_gate,
+                   int nbits, int tgt, int nthreads) {
+  PyArrayObject *psi_arr, *gate_arr;
+  if (!get_arrays<npy_type>(param_psi, param_gate, nbits, 4,
+                            &psi_arr, &gate_arr))
+    return false;
+  cmplx_type *psi = ((cmplx_type *)PyArray_GETPTR1(psi_arr, 0));
   cmplx_type *gate = ((cmplx_type *)PyArray_GETPTR1(gate_arr, 0));
 
-  apply1<cmplx_type>(psi, gate, nbits, tgt);
+  Py_BEGIN_ALLOW_THREADS
+  apply1<cmplx_type>(psi, gate, nbits, tgt, nthreads);
+  Py_END_ALLOW_THREADS
 
   Py_DECREF(psi_arr);
   Py_DECREF(gate_arr);
+  return true;
 }
 
 static PyObject *apply1_c(PyObject *dummy, PyObject *args) {
@@ -92,35 +398,41 @@ static PyObject *apply1_c(PyObject *dummy, PyObject *args) {
   int nbits;
   int tgt;
   int bit_width;
+  int nthreads = 1;
+  bool ok;
 
-  if (!PyArg_ParseTuple(args, "OOiii", &param_psi, &param_gate,
-                        &nbits, &tgt, &bit_width))
+  if (!PyArg_ParseTuple(args, "OOiii|i", &param_psi, &param_gate,
+                        &nbits, &tgt, &bit_width, &nthreads))
     return NULL;
   if (bit_width == 128) {
-    apply1_python<cmplxd, NPY_CDOUBLE>(param_psi,
-                                       param_gate, nbits, tgt);
+    ok = apply1_python<cmplxd, NPY_CDOUBLE>(param_psi,
+                                            param_gate, nbits, tgt, nthreads);
   } else {
-    apply1_python<cmplxf, NPY_CFLOAT>(param_psi,
-                                      param_gate, nbits, tgt);
+    ok = apply1_python<cmplxf, NPY_CFLOAT>(param_psi,
+                                           param_gate, nbits, tgt, nthreads);
   }
+  if (!ok)
+    return NULL;
   Py_RETURN_NONE;
 }
 
 template <typename cmplx_type, int npy_type>
-void applyc_python(PyObject *param_psi, PyObject *param_gate,
-                   int nbits, int ctl, int tgt) {
-  PyArrayObject *psi_arr =
-      (PyArrayObject*) PyArray_FROM_OTF(param_psi, npy_type, NPY_IN_ARRAY);
+bool applyc_python(PyObject *param_psi, PyObject *param_gate,
+                   int nbits, int ctl, int tgt, int nthreads) {
+  PyArrayObject *psi_arr, *gate_arr;
+  if (!get_arrays<npy_type>(param_psi, param_gate, nbits, 4,
+                            &psi_arr, &gate_arr))
+    return false;
   cmplx_type *psi = ((cmplx_type *)PyArray_GETPTR1(psi_arr, 0));
-
-  PyArrayObject *gate_arr =
-    (PyArrayObject*) PyArray_FROM_OTF(param_gate, npy_type, NPY_IN_ARRAY);
   cmplx_type *gate = ((cmplx_type *)PyArray_GETPTR1(gate_arr, 0));
 
-  applyc<cmplx_type>(psi, gate, nbits, ctl, tgt);
+  Py_BEGIN_ALLOW_THREADS
+  applyc<cmplx_type>(psi, gate, nbits, ctl, tgt, nthreads);
+  Py_END_ALLOW_THREADS
 
   Py_DECREF(psi_arr);
   Py_DECREF(gate_arr);
+  return true;
 }
 
 static PyObject *applyc_c(PyObject *dummy, PyObject *args) {
@@ -130,17 +442,227 @@ static PyObject *applyc_c(PyObject *dummy, PyObject *args) {
   int ctl;
   int tgt;
   int bit_width;
+  int nthreads = 1;
+  bool ok;
 
-  if (!PyArg_ParseTuple(args, "OOiiii", &param_psi, &param_gate,
-                        &nbits, &ctl, &tgt, &bit_width))
+  if (!PyArg_ParseTuple(args, "OOiiii|i", &param_psi, &param_gate,
+                        &nbits, &ctl, &tgt, &bit_width, &nthreads))
     return NULL;
   if (bit_width == 128) {
-    applyc_python<cmplxd, NPY_CDOUBLE>(param_psi,
-                                       param_gate, nbits, ctl, tgt);
+    ok = applyc_python<cmplxd, NPY_CDOUBLE>(
+        param_psi, param_gate, nbits, ctl, tgt, nthreads);
   } else {
-    applyc_python<cmplxf, NPY_CFLOAT>(param_psi,
-                                      param_gate, nbits, ctl, tgt);
+    ok = applyc_python<cmplxf, NPY_CFLOAT>(
+        param_psi, param_gate, nbits, ctl, tgt, nthreads);
   }
+  if (!ok)
+    return NULL;
+  Py_RETURN_NONE;
+}
+
+template <typename cmplx_type, int npy_type>
+bool apply2_python(PyObject *param_psi, PyObject *param_gate,
+                   int nbits, int q0, int q1, int nthreads) {
+  PyArrayObject *psi_arr, *gate_arr;
+  if (!get_arrays<npy_type>(param_psi, param_gate, nbits, 16,
+                            &psi_arr, &gate_arr))
+    return false;
+  cmplx_type *psi = ((cmplx_type *)PyArray_GETPTR1(psi_arr, 0));
+  cmplx_type *gate = ((cmplx_type *)PyArray_GETPTR1(gate_arr, 0));
+
+  Py_BEGIN_ALLOW_THREADS
+  apply2<cmplx_type>(psi, gate, nbits, q0, q1, nthreads);
+  Py_END_ALLOW_THREADS
+
+  Py_DECREF(psi_arr);
+  Py_DECREF(gate_arr);
+  return true;
+}
+
+static PyObject *apply2_c(PyObject *dummy, PyObject *args) {
+  PyObject *param_psi = NULL;
+  PyObject *param_gate = NULL;
+  int nbits;
+  int q0;
+  int q1;
+  int bit_width;
+  int nthreads = 1;
+  bool ok;
+
+  if (!PyArg_ParseTuple(args, "OOiiii|i", &param_psi, &param_gate,
+                        &nbits, &q0, &q1, &bit_width, &nthreads))
+    return NULL;
+  if (bit_width == 128) {
+    ok = apply2_python<cmplxd, NPY_CDOUBLE>(
+        param_psi, param_gate, nbits, q0, q1, nthreads);
+  } else {
+    ok = apply2_python<cmplxf, NPY_CFLOAT>(
+        param_psi, param_gate, nbits, q0, q1, nthreads);
+  }
+  if (!ok)
+    return NULL;
+  Py_RETURN_NONE;
+}
+
+template <typename cmplx_type, int npy_type>
+bool applymc_python(PyObject *param_psi, PyObject *param_gate, int nbits,
+                    int ctl_mask, int ctl_value_mask, int tgt, int nthreads) {
+  PyArrayObject *psi_arr, *gate_arr;
+  if (!get_arrays<npy_type>(param_psi, param_gate, nbits, 4,
+                            &psi_arr, &gate_arr))
+    return false;
+  cmplx_type *psi = ((cmplx_type *)PyArray_GETPTR1(psi_arr, 0));
+  cmplx_type *gate = ((cmplx_type *)PyArray_GETPTR1(gate_arr, 0));
+
+  Py_BEGIN_ALLOW_THREADS
+  applymc<cmplx_type>(psi, gate, nbits, ctl_mask, ctl_value_mask, tgt,
+                      nthreads);
+  Py_END_ALLOW_THREADS
+
+  Py_DECREF(psi_arr);
+  Py_DECREF(gate_arr);
+  return true;
+}
+
+static PyObject *applymc_c(PyObject *dummy, PyObject *args) {
+  PyObject *param_psi = NULL;
+  PyObject *param_gate = NULL;
+  int nbits;
+  int ctl_mask;
+  int ctl_value_mask;
+  int tgt;
+  int bit_width;
+  int nthreads = 1;
+  bool ok;
+
+  if (!PyArg_ParseTuple(args, "OOiiiii|i", &param_psi, &param_gate,
+                        &nbits, &ctl_mask, &ctl_value_mask, &tgt,
+                        &bit_width, &nthreads))
+    return NULL;
+  if (bit_width == 128) {
+    ok = applymc_python<cmplxd, NPY_CDOUBLE>(
+        param_psi, param_gate, nbits, ctl_mask, ctl_value_mask, tgt,
+        nthreads);
+  } else {
+    ok = applymc_python<cmplxf, NPY_CFLOAT>(
+        param_psi, param_gate, nbits, ctl_mask, ctl_value_mask, tgt,
+        nthreads);
+  }
+  if (!ok)
+    return NULL;
+  Py_RETURN_NONE;
+}
+
+template <typename cmplx_type, int npy_type>
+bool applymcd_python(PyObject *param_psi, PyObject *param_diag, int nbits,
+                     int ctl_mask, int ctl_value_mask, int tgt,
+                     int nthreads) {
+  PyArrayObject *psi_arr, *diag_arr;
+  if (!get_arrays<npy_type>(param_psi, param_diag, nbits, 2,
+                            &psi_arr, &diag_arr))
+    return false;
+  cmplx_type *psi = ((cmplx_type *)PyArray_GETPTR1(psi_arr, 0));
+  cmplx_type *diag = ((cmplx_type *)PyArray_GETPTR1(diag_arr, 0));
+
+  Py_BEGIN_ALLOW_THREADS
+  applymcd<cmplx_type>(psi, diag, nbits, ctl_mask, ctl_value_mask, tgt,
+                       nthreads);
+  Py_END_ALLOW_THREADS
+
+  Py_DECREF(psi_arr);
+  Py_DECREF(diag_arr);
+  return true;
+}
+
+static PyObject *applyd_c(PyObject *dummy, PyObject *args) {
+  PyObject *param_psi = NULL;
+  PyObject *param_diag = NULL;
+  int nbits;
+  int tgt;
+  int bit_width;
+  int nthreads = 1;
+  bool ok;
+
+  if (!PyArg_ParseTuple(args, "OOiii|i", &param_psi, &param_diag,
+                        &nbits, &tgt, &bit_width, &nthreads))
+    return NULL;
+  if (bit_width == 128) {
+    ok = applymcd_python<cmplxd, NPY_CDOUBLE>(
+        param_psi, param_diag, nbits, 0, 0, tgt, nthreads);
+  } else {
+    ok = applymcd_python<cmplxf, NPY_CFLOAT>(
+        param_psi, param_diag, nbits, 0, 0, tgt, nthreads);
+  }
+  if (!ok)
+    return NULL;
+  Py_RETURN_NONE;
+}
+
+static PyObject *applymcd_c(PyObject *dummy, PyObject *args) {
+  PyObject *param_psi = NULL;
+  PyObject *param_diag = NULL;
+  int nbits;
+  int ctl_mask;
+  int ctl_value_mask;
+  int tgt;
+  int bit_width;
+  int nthreads = 1;
+  bool ok;
+
+  if (!PyArg_ParseTuple(args, "OOiiiii|i", &param_psi, &param_diag,
+                        &nbits, &ctl_mask, &ctl_value_mask, &tgt,
+                        &bit_width, &nthreads))
+    return NULL;
+  if (bit_width == 128) {
+    ok = applymcd_python<cmplxd, NPY_CDOUBLE>(
+        param_psi, param_diag, nbits, ctl_mask, ctl_value_mask, tgt,
+        nthreads);
+  } else {
+    ok = applymcd_python<cmplxf, NPY_CFLOAT>(
+        param_psi, param_diag, nbits, ctl_mask, ctl_value_mask, tgt,
+        nthreads);
+  }
+  if (!ok)
+    return NULL;
+  Py_RETURN_NONE;
+}
+
+template <typename cmplx_type, int npy_type>
+bool applyh_python(PyObject *param_psi, int nbits, int qubit_mask,
+                   int nthreads) {
+  PyArrayObject *psi_arr;
+  if (!get_state<npy_type>(param_psi, nbits, &psi_arr))
+    return false;
+  cmplx_type *psi = ((cmplx_type *)PyArray_GETPTR1(psi_arr, 0));
+
+  Py_BEGIN_ALLOW_THREADS
+  applyh<cmplx_type>(psi, nbits, qubit_mask, nthreads);
+  Py_END_ALLOW_THREADS
+
+  Py_DECREF(psi_arr);
+  return true;
+}
+
+static PyObject *applyh_c(PyObject *dummy, PyObject *args) {
+  PyObject *param_psi = NULL;
+  int nbits;
+  int qubit_mask;
+  int bit_width;
+  int nthreads = 1;
+  bool ok;
+
+  if (!PyArg_ParseTuple(args, "Oiii|i", &param_psi, &nbits, &qubit_mask,
+                        &bit_width, &nthreads))
+    return NULL;
+  if (bit_width == 128) {
+    ok = applyh_python<cmplxd, NPY_CDOUBLE>(param_psi, nbits, qubit_mask,
+                                            nthreads);
+  } else {
+    ok = applyh_python<cmplxf, NPY_CFLOAT>(param_psi, nbits, qubit_mask,
+                                           nthreads);
+  }
+  if (!ok)
+    return NULL;
   Py_RETURN_NONE;
 }
 
@@ -152,6 +674,16 @@ static PyMethodDef xgates_methods[] = {
      "Apply single-qubit gate, complex double"},
     {"applyc", applyc_c, METH_VARARGS,
      "Apply controlled qubit gate, complex double"},
+    {"apply2", apply2_c, METH_VARARGS,
+     "Apply two-qubit gate, complex double"},
+    {"applymc", applymc_c, METH_VARARGS,
+     "Apply multi-controlled qubit gate, complex double"},
+    {"applyd", applyd_c, METH_VARARGS,
+     "Apply diagonal single-qubit gate, complex double"},
+    {"applymcd", applymcd_c, METH_VARARGS,
+     "Apply diagonal multi-controlled qubit gate, complex double"},
+    {"applyh", applyh_c, METH_VARARGS,
+     "Apply Hadamard gates to many qubits, complex double"},
     {NULL, NULL, 0, NULL}};
 
 static struct PyModuleDef xgates_definition = {
@@ -7,9 +7,8 @@ from typing import List
 from absl import app
 import numpy as np
 
-from src.lib import helper
+from src.lib import amplification
 from src.lib import ops
-from src.lib import state
 
 
 # This is the implementation of a quantum minimum finding algorithm
@@ -71,37 +70,29 @@ def get_distro(min_value: int, max_value: int, num_vals: int):
 
 
 def make_f(d: int, numbers: List[int], max_value: int):
-  """Construct function that will return 1 for each number up to max."""
+  """Construct predicate that is True for each number up to max."""
 
+  # The predicate is vectorized, it accepts an int or an array of ints.
   num_inputs = 2**d
   answers = np.zeros(num_inputs, dtype=np.int8)
   answers[[i for i in numbers if i < max_value]] = 1
-  return lambda bits: answers[helper.bits2val(bits)]
+  return lambda x: answers[x] == 1
 
 
 def run_experiment(nbits: int, numbers: List[int],
                    max_value: int, solutions: int) -> int:
   """Run oracle-based experiment."""
 
-  psi = state.zeros(nbits) * state.ones(1)
-  for i in range(nbits + 1):
-    psi.apply1(ops.Hadamard(), i)
-
   # The following is commented extensively in grover.py
   f = make_f(nbits, numbers, max_value)
-  uf = ops.OracleUf(nbits + 1, f)
-
-  op_zero = ops.ZeroProjector(nbits)
-  reflection = op_zero * 2.0 - ops.Identity(nbits)
-
-  hn = ops.Hadamard(nbits)
-  inversion = hn(reflection(hn)) * ops.Identity()
-  grover = inversion(uf)
+  oracle = ops.PhaseOracle(nbits, f)
+  grover = amplification.Amplifier(amplification.uniform(nbits), oracle)
+  psi = grover.prepared
 
   iterations = int(math.pi / 4 * math.sqrt(2**nbits / solutions))
 
   for _ in range(iterations):
-    psi = grover(psi)
+    psi = grover.step(psi)
 
   # Measurement - pick elements with highest probability.
   # For n marked numbers there should be n results.
@@ -109,16 +100,13 @@ def run_experiment(nbits: int, numbers: List[int],
   results = []
   for idx, val in enumerate(psi):
     if val * val.conj() >= maxprob - 0.01:
-      bits = helper.val2bits(idx, 8)[:-1]
-      res = helper.bits2val(bits)
-      results.append(res)
+      results.append(idx)
 
   # Compute new max limit by randomly selecting one of the results,
   # this simulating an actual, random measurement result:
   new_max = np.random.choice(results)
   print(' -> New Max:', new_max)
-  result = f(helper.val2bits(new_max, nbits))
-  if result != 1:
+  if not f(new_max):
     raise AssertionError('something went wrong, measured invalid state')
 
   # Return the newly found upper limit for the search.
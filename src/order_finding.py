@@ -14,9 +14,9 @@ from typing import List, Tuple
 
 from absl import app
 from absl import flags
+import numpy as np
 
 from src.lib import circuit
-from src.lib import helper
 
 
 # Good values to try and factor are:
@@ -183,23 +183,16 @@ def main(argv):
   inverse_qft(qc, up, 2 * nbits, with_swaps=True)
 
   print('Measurement...')
-  total_prob = 0.0
-  for bits in helper.bitprod(nbits * 4 + 2):
-    prob = qc.psi.prob(*bits)
-    if prob > 0.01:
-      bitslice = bits[nbits + 2 : nbits + 2 + nbits * 2][::-1]
-      intval = helper.bits2val(bitslice)
-      phase = helper.bits2frac(bitslice)
-
-      r = fractions.Fraction(phase).limit_denominator(8).denominator
-      guesses = [math.gcd(a ** (r // 2) - 1, number),
-                 math.gcd(a ** (r // 2) + 1, number)]
-      print('Final x: {:3d} phase: {:3f} prob: {:.3f} factors: {}'.
-            format(intval, phase, prob.real, guesses))
-
-    total_prob += prob
-    if total_prob > 0.999:
-      break
+  # The up register holds x in reversed bit order.
+  probs = qc.reg_probabilities(up[::-1])
+  for intval in np.nonzero(probs > 0.01)[0]:
+    phase = intval / 2**(nbits * 2)
+
+    r = fractions.Fraction(phase).limit_denominator(8).denominator
+    guesses = [math.gcd(a ** (r // 2) - 1, number),
+               math.gcd(a ** (r // 2) + 1, number)]
+    print('Final x: {:3d} phase: {:3f} prob: {:.3f} factors: {}'.
+          format(intval, phase, probs[intval], guesses))
 
   print(qc.stats())
 
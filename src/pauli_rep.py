@@ -9,6 +9,7 @@ import numpy as np
 
 from src.lib import circuit
 from src.lib import ops
+from src.lib import pauli
 from src.lib import state
 
 
@@ -30,14 +31,13 @@ def single_qubit():
     #                 i=0
     #
     # To compute the various factors c_i, we multiply the Pauli
-    # matrices with the density matrix and take the trace. This
-    # trace is the computed factor:
+    # matrices with the density matrix and take the trace.
+    # pauli_decompose computes all of these traces at once, with a
+    # fast transform (see pauli.py). It returns c_i / 2, the factors
+    # in rho = Sum(c_i/2 * Pauli_i):
     #
     rho = qc.psi.density()
-    c = np.trace(ops.Identity() @ rho)
-    x = np.trace(ops.PauliX() @ rho)
-    y = np.trace(ops.PauliY() @ rho)
-    z = np.trace(ops.PauliZ() @ rho)
+    c, x, y, z = 2 * pauli.pauli_decompose(qc.psi)
 
     # Let's verify the result and construct a density matrix
     # from the Pauli matrices using the computed factors:
@@ -49,6 +49,8 @@ def single_qubit():
         + z * ops.PauliZ()
     )
     assert np.allclose(rho, new_rho, atol=1e-06), 'Invalid Pauli Representation'
+    assert np.allclose(rho, pauli.pauli_reconstruct([c, x, y, z]) / 2,
+                       atol=1e-06), 'Invalid Pauli reconstruction'
 
     print(f'qubit({qc.psi[0]:11.2f}, {qc.psi[1]:11.2f}) = ', end='')
     print(f'{i:11.2f} I + {x:11.2f} X + {y:11.2f} Y + {z:11.2f} Z')
@@ -101,14 +103,11 @@ def two_qubit():
     #                i,j=0
     #
     # To compute the various factors c_ij, we multiply the Pauli
-    # tensor products with the density matrix and take the trace. This
-    # trace is the computed factor:
+    # tensor products with the density matrix and take the trace. As
+    # for a single qubit, pauli_decompose computes all of them at once,
+    # ordered with the first qubit's Pauli matrix as the major index:
     paulis = [ops.Identity(), ops.PauliX(), ops.PauliY(), ops.PauliZ()]
-    c = np.zeros((4, 4), dtype=np.complex64)
-    for i in range(4):
-      for j in range(4):
-        tprod = paulis[i] * paulis[j]
-        c[i][j] = np.trace(rho @ tprod)
+    c = 4 * pauli.pauli_decompose(qc.psi).reshape(4, 4)
 
     # Let's verify the result and construct a density matrix
     # from the Pauli matrices using the computed factors:
@@ -121,12 +120,37 @@ def two_qubit():
     assert np.allclose(rho, new_rho / 4, atol=1e-5), 'Invalid'
 
 
+def multi_qubit(nbits: int = 8):
+  """Decompose and reconstruct a larger random state."""
+
+  # With 4^n factors, computing each one as the trace of a matrix
+  # product would cost O(16^n). The transform in pauli_decompose only
+  # costs O(n 4^n), as does the reconstruction.
+  qc = circuit.qc('random state')
+  qc.random(nbits)
+  rho = qc.psi.density()
+  coeffs = pauli.pauli_decompose(qc.psi)
+  assert np.allclose(rho, pauli.pauli_reconstruct(coeffs),
+                     atol=1e-5), 'Invalid reconstruction'
+
+  # The factors of a pure state's Pauli strings are its expectation
+  # values (over 2^n). Its purity Tr(rho^2) = 2^n Sum(c_P^2) is 1.
+  purity = (1 << nbits) * np.sum(np.abs(coeffs) ** 2)
+  assert np.isclose(purity, 1.0, atol=1e-5), 'Invalid purity'
+  largest = np.argsort(-np.abs(coeffs))[:4]
+  print(f'{nbits} qubits, {len(coeffs)} Pauli strings, largest factors:')
+  for idx in largest:
+    string = np.base_repr(idx, 4).zfill(nbits)
+    print(f'  {coeffs[idx]:8.4f} ', ''.join('IXYZ'[int(d)] for d in string))
+
+
 def main(argv):
   if len(argv) > 1:
     raise app.UsageError('Too many command-line arguments.')
 
   single_qubit()
   two_qubit()
+  multi_qubit()
 
 
 if __name__ == '__main__':
@@ -42,12 +42,11 @@ def phase_estimation(psi: state.State, u: ops.Operator, t: int) -> state.State:
   # 'nbits' qubits   |       |           |
   # |u> --- U^1 --- U^2 --- U^4 ... --- U^s^(t-1)
   #
+  # ops.PhaseEstimation diagonalizes U once and applies the powers of
+  # U in its eigenbasis, without building the controlled operators.
+  #
   psi = ops.Hadamard(t)(psi)
-  u2 = u
-  for inv in reversed(range(t)):
-    psi = ops.ControlledU(inv, t, u2)(psi, inv)
-    u2 = u2(u2)
-  return psi
+  return ops.PhaseEstimation(u, psi, t, t)
 
 
 def run_experiment(nbits: int, t: int = 8):
@@ -80,7 +79,7 @@ def run_experiment(nbits: int, t: int = 8):
   # inverse QFT.
   psi = state.zeros(t) * state.State(eigvecs[:, eigen_index])
   psi = phase_estimation(psi, u, t)
-  psi = ops.Qft(t).adjoint()(psi)
+  psi = ops.apply_qft(psi, 0, t, inverse=True)
 
   # Find state with highest measurement probability and show results.
   maxbits, maxprob = psi.maxprob()
@@ -140,7 +139,7 @@ def run_experiment_multi(nbits: int, t: int = 8):
   # Make state and circuit to estimate phi (similar to above).
   psi = state.zeros(t) * state.State(ini)
   psi = phase_estimation(psi, u, t)
-  psi = ops.Qft(t).adjoint()(psi)
+  psi = ops.apply_qft(psi, 0, t, inverse=True)
 
   # Find states with highest measurement probabilities and show results.
   # This should match in 'most' cases. A more sophisticated analysis to
@@ -56,10 +56,9 @@ def purify(rho: ops.Operator, nbits: int):
                    psi1.reshape((2**nbits, 2**nbits)).transpose())
   assert np.allclose(rho, reduced), 'Wrong reduced density'
 
-  # Another way to compute the reduced density matrix:
-  reduced = ops.TraceOut(state.State(psi1).density(),
-                         [x for x in range(int(nbits),
-                                           int(nbits*2))])
+  # Another way to compute the reduced density matrix, directly
+  # from the state, without its density matrix:
+  reduced = state.State(psi1).reduced_density(range(int(nbits)))
   assert np.allclose(rho, reduced), 'Wrong reduced density'
 
 
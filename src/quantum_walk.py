@@ -50,14 +50,13 @@ def experiment_incr():
   """Run a few incr experiments."""
 
   qc = circuit.qc('incr')
-  qc.reg(4, 0)
+  reg = qc.reg(4, 0)
   aux = qc.reg(4)
 
   for val in range(15):
     incr(qc, 0, 4, aux, [])
 
-    maxbits, _ = qc.psi.maxprob()
-    res = helper.bits2val(maxbits[0:4])
+    res = qc.reg_probabilities(reg).argmax()
     if val + 1 != res:
       raise AssertionError('Invalid Result')
 
@@ -65,14 +64,13 @@ def experiment_incr():
 def experiment_decr():
   """Run a few decr experiments."""
   qc = circuit.qc('decr')
-  qc.reg(4, 15)
+  reg = qc.reg(4, 15)
   aux = qc.reg(4)
 
   for val in range(15, 0, -1):
     decr(qc, 0, 4, aux, [])
 
-    maxbits, _ = qc.psi.maxprob()
-    res = helper.bits2val(maxbits[0:4])
+    res = qc.reg_probabilities(reg).argmax()
     if val - 1 != res:
       raise AssertionError('Invalid Result')
 
@@ -107,13 +105,12 @@ def experiment_mod_9():
   """Run a few incr-mod-9 experiments."""
 
   qc = circuit.qc('incr')
-  qc.reg(4, 0)
+  reg = qc.reg(4, 0)
   aux = qc.reg(5)  # extra aux
 
   for val in range(18):
     incr_mod_9(qc, aux)
-    maxbits, _ = qc.psi.maxprob()
-    res = helper.bits2val(maxbits[0:4])
+    res = qc.reg_probabilities(reg).argmax()
     if ((val + 1) % 9) != res:
       raise AssertionError('Invalid Result')
 
@@ -8,10 +8,10 @@ from typing import List
 
 from absl import app
 import numpy as np
+from src.lib import amplification
 from src.lib import circuit
 from src.lib import helper
 from src.lib import ops
-from src.lib import state
 
 
 # 3-Sat Satisfyability Decision Problem:
@@ -88,7 +88,7 @@ def make_formula(variables: int, clauses: int):
 
 
 def make_f(variables: int, formula):
-  """Construct function that evaluates formula."""
+  """Construct predicate that evaluates formula over state indices."""
 
   # This is the simplest approach where we construct
   # an operator. However, this construction requires
@@ -97,17 +97,24 @@ def make_f(variables: int, formula):
   # to first prove out that Grover would work on this
   # kind of input function (of course it does!).
   #
-  num_inputs = 1 << variables
-  answers = np.zeros(num_inputs, dtype=np.int8)
+  # The predicate is vectorized. It evaluates the formula
+  # for an int or an array of ints at once, just like
+  # eval_formula() does for a single list of bits.
+  #
+  def f(x):
+    res = True
+    for clause in formula:
+      sat = False
+      for idx, literal in enumerate(clause):
+        sat = sat | (((x >> (variables - 1 - idx)) & 1) == literal)
+      res = res & sat
 
-  for bits in itertools.product([0, 1], repeat=variables):
-    res = eval_formula(bits, formula)
     # Note: We negate the result, as for small numbers
     # of clauses there are more positives than negatives.
     #
-    answers[helper.bits2val(bits)] = not res
+    return np.logical_not(res)
 
-  return lambda bits: answers[helper.bits2val(bits)]
+  return f
 
 
 def find_negative_solutions(variables: int, formula):
@@ -124,26 +131,19 @@ def grover_with_oracle(nbits: int, clauses: int, solutions: int):
 
   formula = make_formula(nbits, clauses)
 
-  psi = state.zeros(nbits) * state.ones(1)
-  for i in range(nbits + 1):
-    psi.apply1(ops.Hadamard(), i)
-
-  hn = ops.Hadamard(nbits)
   f = make_f(nbits, formula)
-  uf = ops.OracleUf(nbits + 1, f)
-  op_zero = ops.ZeroProjector(nbits)
-  reflection = op_zero * 2.0 - ops.Identity(nbits)
-  inversion = hn(reflection(hn)) * ops.Identity()
-  grover = inversion(uf)
+  oracle = ops.PhaseOracle(nbits, f)
+  grover = amplification.Amplifier(amplification.uniform(nbits), oracle)
 
-  iterations = int(math.pi / 4 * math.sqrt(2**nbits / solutions))
-  for _ in range(iterations):
-    psi = grover(psi)
+  # A random formula may have more than the expected number of
+  # solutions. The Amplifier derives the optimal number of iterations
+  # from the Oracle itself.
+  psi = grover.run()
 
   maxbits, maxprob = psi.maxprob()
-  result = f(maxbits[:-1])
+  result = int(f(helper.bits2val(maxbits)))
   print('Oracle: Got f({}) = {}, want: 1, #: {:2d}, p: {:6.4f}'
-        .format(maxbits[:-1], result, solutions, maxprob))
+        .format(maxbits, result, solutions, maxprob))
   if result != 1:
     raise AssertionError('Wrong result in Grover.')
 
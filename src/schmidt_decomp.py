@@ -35,42 +35,39 @@ from src.lib import state
 def compute_eigvals(psi: state.State, expected: int, tolerance: float):
   """Compute the eigenvalues for the individial substates."""
 
-  # To find the factors \alpha and the new bases,
-  # we trace out the subspaces and find their eigenvalues.
+  # The factors \alpha are the eigenvalues of the reduced density
+  # matrices of both substates, which are identical. Instead of tracing
+  # out the subspaces and computing them (and the new bases) one by one,
+  # we reshape psi to a 2x2 matrix. Its SVD gives the coefficients
+  # \sqrt(\alpha) as the singular values, and both new bases.
   #
-  rho = psi.density()
+  coeffs, u, vh = psi.schmidt([0])
+  eigvals = coeffs**2
 
-  rho0 = ops.TraceOut(rho, [1])
-  eigvals0 = np.linalg.eigvalsh(rho0)
-
-  rho1 = ops.TraceOut(rho, [0])
-  eigvals1 = np.linalg.eigvalsh(rho1)
-
-  # The set of eigenvalues must be identical between the two sub states.
+  # These are the eigenvalues of the reduced density matrices.
   #
-  assert np.allclose(eigvals0, eigvals1, atol=1e-6), 'Whaa'
+  assert np.allclose(np.sort(eigvals),
+                     np.linalg.eigvalsh(psi.reduced_density([1])),
+                     atol=1e-6), 'Whaa'
 
   # The eigenvalues must add up to 1.0.
   #
-  assert np.allclose(np.sum(eigvals0), 1.0), 'Whaa'
+  assert np.allclose(np.sum(eigvals), 1.0), 'Whaa'
 
   # Count the number of nonzero eigenvalues and match against expected.
   #
-  nonzero = np.sum(eigvals0 > tolerance)
+  nonzero = np.sum(eigvals > tolerance)
   if nonzero != expected:
-    print(f'\t\tCase of unstable math: {eigvals0[0]:.4f}, {eigvals0[1]:.4f}')
+    print(f'\t\tCase of unstable math: {eigvals[0]:.4f}, {eigvals[1]:.4f}')
 
-  # Construct the state from the eigenvalues and the new bases
-  # which we derive via SVD. Then we check whether the new state
-  # matches the original state.
+  # Construct the state from the coefficients and the new bases.
+  # Then we check whether the new state matches the original state.
   #
-  u0, d0, _ = np.linalg.svd(rho0)
-  a1, _, _ = np.linalg.svd(rho1)
-  newpsi = (np.sqrt(d0[0]) * np.kron(u0[:, 0], a1[0, :]) +
-            np.sqrt(d0[1]) * np.kron(u0[:, 1], a1[1, :]))
+  newpsi = (coeffs[0] * np.kron(u[:, 0], vh[0, :]) +
+            coeffs[1] * np.kron(u[:, 1], vh[1, :]))
   assert np.allclose(psi, newpsi, atol=1e-3), 'Incorrect Schmidt basis'
 
-  return eigvals0
+  return eigvals
 
 
 def main(argv):
@@ -114,6 +111,13 @@ def main(argv):
   if abs(eigv[0] - eigv[1]) > 0.001:
     raise AssertionError('Incorrect computation for max-entangled state.')
 
+  # The entanglement entropy of a maximally entangled state of two
+  # qubits is 1 (bit), separable states have entropy 0.
+  if abs(psi.entropy([0]) - 1.0) > 0.001:
+    raise AssertionError('Incorrect entropy for max-entangled state.')
+  if state.zeros(2).entropy([0]) > 0.001:
+    raise AssertionError('Incorrect entropy for separable state.')
+
   print('Success')
 
 
@@ -1,17 +1,15 @@
 # python3
 """Example: Various Techniques for State Preparation."""
 
-import math
 import random
 from typing import List
 
 from absl import app
 import numpy as np
 
+from src.lib import amplification
 from src.lib import circuit
-from src.lib import helper
 from src.lib import ops
-from src.lib import state
 
 
 # --------------------------------------------------------------
@@ -28,12 +26,12 @@ from src.lib import state
 # --------------------------------------------------------------
 
 
-def make_f(dim: int, states: List[int]):
-  """Construct function that will return 1 for each entry in states."""
+def make_mask(dim: int, states: List[int]) -> np.ndarray:
+  """Construct Oracle mask that is True for each entry in states."""
 
-  answers = np.zeros(1 << dim, dtype=np.int8)
-  answers[states] = 1
-  return lambda bits: answers[helper.bits2val(bits)]
+  mask = np.zeros(1 << dim, dtype=bool)
+  mask[states] = True
+  return mask
 
 
 def run_experiment_qaa(nbits: int, states: List[int]) -> None:
@@ -41,24 +39,13 @@ def run_experiment_qaa(nbits: int, states: List[int]) -> None:
 
   # In the following, we construct and apply the Grover operator similar to
   # what was shown in grover.py and amplitude_amplification.py. There are
-  # many more comments to be found in those files.
+  # many more comments to be found in those files. The Oracle is
+  # just a mask over the states of interest, and the Amplifier
+  # computes the optimal number of iterations.
   #
-  op_zero = ops.ZeroProjector(nbits)
-  reflection = op_zero * 2.0 - ops.Identity(nbits)
-  f = make_f(nbits, states)
-  uf = ops.OracleUf(nbits + 1, f)
-
-  psi = state.zeros(nbits) * state.ones(1)
-  for i in range(nbits + 1):
-    psi.apply1(ops.Hadamard(), i)
-
-  hn = ops.Hadamard(nbits)
-  inversion = hn(reflection(hn)) * ops.Identity()
-  grover = inversion(uf)
-
-  iterations = int(math.pi / 4 * math.sqrt(2**nbits / len(states)))
-  for _ in range(iterations):
-    psi = grover(psi)
+  amp = amplification.Amplifier(amplification.uniform(nbits),
+                                make_mask(nbits, states))
+  psi = amp.run()
 
   # At this point amplitude amplification is done and the states of
   # interest should have meaningfully higher probabilities than any
@@ -66,17 +53,16 @@ def run_experiment_qaa(nbits: int, states: List[int]) -> None:
   #
   prob_states = []
   probability = 0.0
-  ampl = 0.0 + 0j
+  ampl = 0.0
   for idx, val in enumerate(psi):
     if val > 0.09:
-      bin_pattern = helper.val2bits(idx, nbits)[:-1]
       probability = np.real(val * val.conj())
-      prob_states.append(helper.bits2val(bin_pattern))
+      prob_states.append(idx)
       continue
-    ampl = max(ampl, val)
+    ampl = max(ampl, abs(val))
 
-  print(f'Prob: {probability:.3f}, Rest: {np.real(ampl * ampl.conj()):.3f} '
-        f'Factor: {probability / np.real(ampl * ampl.conj()):5.1f} '
+  print(f'Prob: {probability:.3f}, Rest: {ampl * ampl:.3f} '
+        f'Factor: {probability / (ampl * ampl):5.1f} '
         f' {sorted(prob_states)} ')
   if sorted(prob_states) != sorted(states):
     raise AssertionError('Incorrect state preparation')
@@ -43,6 +43,7 @@ import numpy as np
 
 from src.lib import circuit
 from src.lib import ops
+from src.lib import pauli
 
 flags.DEFINE_integer('experiments', 1000, 'Number of experiments')
 flags.DEFINE_integer('shots', 1000, 'Number of random samples')
@@ -115,29 +116,13 @@ def run_two_qubit_zi_experiment():
     full_ansatz(qc)
     qc.z(0)
 
-    # Measure the probablities as computed from the amplitudes.
-    # We only do this once per experiment.
-    p0, _ = qc.measure_bit(0, collapse=True)
-    p1, _ = qc.measure_bit(1, collapse=True)
-
     # Simulate multiple measurements by sampling over the probabilities
-    # to obtain a distribution of sampled states. The measurements above
-    # are the probablities that a state would be found in the |0> state.
-    # For each bit, we compare this probability against another random value r.
-    # If the measured probability is < r, we pretend we've actually measured an
-    # |0> state, else a |1> state. We do this via sample_state() on both qubits.
+    # to obtain a distribution of sampled states. All shots are drawn
+    # at once from the probabilities of the states |q0 q1>.
     #
-    def sample_state(prob_state0: float):
-      if prob_state0 < random.random():
-        return 1
-      return 0
-
     num_shots = flags.FLAGS.shots
-    counts = [0] * 4
-    for _ in range(num_shots):
-      bit0 = sample_state(p0)
-      bit1 = sample_state(p1)
-      counts[bit1 * 2 + bit0] += 1
+    hist = qc.sample(num_shots, [0, 1], counts=True)
+    counts = [hist.get(val, 0) for val in range(4)]
 
     # Compute the expectation value from samples measurements. Again,
     #   |00> and |01> map to Eigenvalue +1
@@ -213,10 +198,11 @@ def run_single_qubit_measure():
   a = random.random()
   b = random.random()
   c = random.random()
-  hamil = a * ops.PauliX() + b * ops.PauliY() + c * ops.PauliZ()
+  hamil = (a * pauli.PauliString('X') + b * pauli.PauliString('Y') +
+           c * pauli.PauliString('Z'))
 
   # Compute known minimum eigenvalue.
-  eigvals = np.linalg.eigvalsh(hamil)
+  eigvals = np.linalg.eigvalsh(hamil.dense())
 
   min_val = 1000.0
   for i in range(0, 360, 5):
@@ -225,22 +211,12 @@ def run_single_qubit_measure():
       theta = np.pi * i / 360.0
       phi = np.pi * j / 180.0
 
-      # X Basis
-      qc = single_qubit_ansatz(theta, phi)
-      qc.h(0)
-      val_a = a * qc.pauli_expectation(0)
-
-      # Y Basis
-      qc = single_qubit_ansatz(theta, phi)
-      qc.sdag(0)
-      qc.h(0)
-      val_b = b * qc.pauli_expectation(0)
-
-      # Z Basis
+      # On hardware, we would measure each term in its own basis, by
+      # rotating X (with H) and Y (with S^dagger and H) into Z, with
+      # a new run of the ansatz for each. Here, each term's expectation
+      # value is computed directly from the state (see pauli.py).
       qc = single_qubit_ansatz(theta, phi)
-      val_c = c * qc.pauli_expectation(0)
-
-      expectation = val_a + val_b + val_c
+      expectation = hamil.expectation(qc.psi).real
       if expectation < min_val:
         min_val = expectation
 